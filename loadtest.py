@@ -0,0 +1,83 @@
+"""Concurrent load generator for the recommendation API
+
+Runs a fixed number of client threads against one endpoint for a while and
+prints the status code mix and latency percentiles, e.g.
+
+    python loadtest.py "http://localhost:5000/api/search?q=space+{n}&n=100&diversify=0.5" \
+        --clients 64 --seconds 30
+
+`{n}` in the URL is replaced by a random number on every request, so cached
+rankings do not hide the scoring cost. Clients wait out Retry-After on 429
+and 503 responses, as well-behaved API clients do. With --probe, one extra
+client requests a cheap endpoint throughout, to show how the load affects
+everything else.
+"""
+import argparse
+import random
+import threading
+import time
+from collections import Counter
+
+import requests
+
+
+def run(url, clients, seconds, timeout, probe=None):
+    """Return {label: {status: [seconds]}} for the load clients and the probe"""
+    latencies = {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client(label, target):
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            retry_after = 0.0
+            try:
+                response = session.get(target.replace('{n}', str(random.randrange(10 ** 9))), timeout=timeout)
+                status = response.status_code
+                if status in (429, 503):
+                    retry_after = float(response.headers.get('Retry-After', 0))
+            except requests.RequestException:
+                status = 'error'
+            elapsed = time.monotonic() - started
+            with lock:
+                latencies.setdefault(label, {}).setdefault(status, []).append(elapsed)
+            time.sleep(retry_after)
+
+    threads = [threading.Thread(target=client, args=('load', url), daemon=True) for _ in range(clients)]
+    if probe:
+        threads.append(threading.Thread(target=client, args=('probe', probe), daemon=True))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure API latency under concurrent load')
+    parser.add_argument('url', help='Endpoint to request; {n} is replaced by a random number')
+    parser.add_argument('--clients', type=int, default=32, help='Concurrent client threads')
+    parser.add_argument('--seconds', type=float, default=20.0)
+    parser.add_argument('--timeout', type=float, default=30.0, help='Client-side request timeout')
+    parser.add_argument('--probe', help='Cheap endpoint requested by one extra client throughout the run')
+    args = parser.parse_args()
+
+    latencies = run(args.url, args.clients, args.seconds, args.timeout, probe=args.probe)
+    for label, by_status in latencies.items():
+        total = sum(len(values) for values in by_status.values())
+        print(f"{label}: {total} requests in {args.seconds:.0f}s ({total / args.seconds:.1f}/s)")
+        print("  status mix: " + ", ".join(f"{status}: {count}" for status, count in
+                                            Counter({s: len(v) for s, v in by_status.items()}).most_common()))
+        for status, values in sorted(by_status.items(), key=lambda item: str(item[0])):
+            print(f"  {status}: p50 {percentile(values, 0.5) * 1000:.1f} ms, "
+                  f"p95 {percentile(values, 0.95) * 1000:.1f} ms, p99 {percentile(values, 0.99) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,42 @@
 import os
+import sys
+import gzip
 import json
 import nltk
 import numpy as np
 import requests
 import time
 import re
+import zlib
+import base64
+import hashlib
+import math
+import itertools
+import unicodedata
+import atexit
+import queue
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from collections import Counter, OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from flask import Flask, request, jsonify, render_template
 from flask_cors import CORS
 from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from datetime import datetime
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer, ENGLISH_STOP_WORDS
+from sklearn.preprocessing import normalize
+from sklearn.utils import murmurhash3_32
+from scipy import sparse
+from datetime import datetime, timezone
 import random
+from functools import wraps
+
+try:
+    import brotli  # Optional: enables br-encoded responses
+except ImportError:
+    brotli = None
 
 # Ensure NLTK data is downloaded
 nltk.download('punkt', quiet=True)
@@ -27,6 +50,8 @@ CORS(app)  # Enable CORS for all routes
 # Constants
 DATA_FILE = "movie_data.json"
 API_KEY_FILE = "tmdb_api_key.txt"
+DUPLICATE_REPORT_FILE = "duplicate_report.json"
+CHECKPOINT_FILE = "ingest_checkpoint.json"
 TMDB_BASE_URL = "https://api.themoviedb.org/3"
 
 # Updated target counts
@@ -38,16 +63,927 @@ WEB_SERIES_COUNT = 500
 # Total target count
 TARGET_MOVIE_COUNT = 5026
 
+SOUTH_INDIAN_LANGUAGES = {
+    "ta": "Tamil",
+    "te": "Telugu",
+    "ml": "Malayalam",
+    "kn": "Kannada"
+}
+
+# Staged ingestion pipeline
+PIPELINE_QUEUE_SIZE = 200  # Items buffered between two stages before the producer blocks
+DISCOVER_WORKERS = 2
+DETAIL_FETCH_WORKERS = 4
+CHECKPOINT_EVERY = 100  # Persisted titles between checkpoints
+RESULTS_PER_PAGE = 20  # TMDB listing page size
+MIN_PAGE_YIELD = 1.0  # Wanted new titles a discover page must be expected to bring
+PIPELINE_STATS_INTERVAL = 15  # Seconds between stage statistics printouts
+
+# Near-duplicate detection (MinHash LSH) during ingestion
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16  # 16 bands x 4 rows: ~0.5 collision probability at Jaccard 0.5
+NEAR_DUPLICATE_THRESHOLD = 0.8  # Estimated Jaccard similarity that counts as a duplicate
+
+# Serving limits
+DEFAULT_RESULTS = 10
+MAX_RESULTS = 100  # Upper bound for the `n` query parameter
+SCORING_POOL_ENABLED = os.environ.get('SCORING_POOL', '1') != '0'  # Set SCORING_POOL=0 to score inline
+SCORING_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+SCORING_QUEUE_LIMIT = 32  # Requests allowed to wait for a free scoring worker
+SCORING_TIMEOUT = 5.0  # Seconds a request may wait for its scores
+MAX_PROFILE_SEEDS = 500  # Most watched titles accepted by a profile request
+MMR_POOL_SIZE = 200  # Candidates re-ranked when diversification is requested
+
+# Hybrid scoring: text similarity blended with per-title features
+BLEND_POOL_SIZE = 200  # Text candidates re-scored when a blend is requested
+BAYES_MIN_VOTES = 50  # Prior strength (in votes) for the Bayesian rating
+RECENCY_HALF_LIFE_YEARS = 10
+BLEND_FEATURES = ('text', 'popularity', 'rating', 'recency')
+SCORING_BLENDS = {
+    'text': {'text': 1.0},
+    'balanced': {'text': 0.7, 'popularity': 0.1, 'rating': 0.15, 'recency': 0.05},
+    'popular': {'text': 0.5, 'popularity': 0.35, 'rating': 0.15},
+    'acclaimed': {'text': 0.5, 'rating': 0.4, 'popularity': 0.1},
+    'fresh': {'text': 0.6, 'recency': 0.3, 'popularity': 0.1},
+}
+DEFAULT_BLEND = os.environ.get('SCORING_BLEND', 'text')
+
+# Model build
+TFIDF_MAX_FEATURES = 5000
+CHUNKED_BUILD = os.environ.get('CHUNKED_BUILD', '0') != '0'  # Set CHUNKED_BUILD=1 for catalogs too big to vectorise at once
+BUILD_CHUNK_SIZE = int(os.environ.get('BUILD_CHUNK_SIZE', '20000'))  # Titles preprocessed and vectorised per chunk
+HASHING_FEATURES = 2 ** 20  # Hash buckets counted before the TFIDF_MAX_FEATURES most frequent are kept
+MODEL_DIR = "model_data"  # Memory-mapped matrices written by the chunked build
+
+# Field-weighted search over separately indexed record fields
+FIELD_INDEX_ENABLED = os.environ.get('FIELD_INDEX', '1') != '0'
+SEARCH_FIELDS = ('title', 'overview', 'genres', 'people', 'keywords', 'tags')
+FIELD_WEIGHT_PRESETS = {
+    'actor': {'people': 4.0, 'title': 1.0, 'overview': 0.5},
+    'plot': {'overview': 3.0, 'keywords': 2.0, 'genres': 1.0, 'title': 0.5},
+    'title': {'title': 4.0, 'keywords': 0.5, 'overview': 0.5},
+    'balanced': {'title': 2.0, 'people': 1.5, 'overview': 1.0, 'keywords': 1.0, 'genres': 0.5, 'tags': 0.5},
+}
+
+# HTTP revalidation and compressed response caching
+HTTP_CACHE_CONTROL = {
+    'movie': 'public, max-age=3600',
+    'popular': 'public, max-age=300',
+    'top_rated': 'public, max-age=300',
+    'recommendations': 'public, max-age=600',
+}
+COMPRESSION_MIN_BYTES = 512  # Smaller bodies are sent uncompressed
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Encoded bodies kept across all cached responses
+
+CONTENT_TYPES = ('movie', 'tv')  # Movie and TV IDs are separate TMDB namespaces
+
+# Cast/crew graph recommendations
+RECOMMENDATION_MODES = ('text', 'people', 'mixed')
+PEOPLE_NEIGHBOURS = 100  # Co-occurrence neighbours precomputed per title
+PEOPLE_MIX_WEIGHT = 0.5  # Share of the people similarity in 'mixed' mode
+CREW_WEIGHT = 1.5  # Director/creator edge weight relative to the top-billed cast member
+PEOPLE_BUILD_CHUNK = 2000  # Titles whose neighbours are computed per sparse product
+
+# Spelling correction applied to search queries
+SPELL_CORRECTION_ENABLED = os.environ.get('SPELL_CORRECTION', '1') != '0'
+SPELL_MAX_EDIT_DISTANCE = 2
+SPELL_PREFIX_LENGTH = 7  # Only this many leading characters are indexed as deletes
+SPELL_MIN_WORD_LENGTH = 3  # Shorter query words are never corrected
+
+# Cursor pagination
+PAGINATION_DEPTH = 500  # Ranked results kept per query for later pages
+RANKING_CACHE_TTL = 300  # Seconds a cached ranking stays valid
+RANKING_CACHE_MAX_ROWS = 1_000_000  # Total ranked rows kept across all queries
+
+# Scatter-gather scoring across worker processes (0 or 1 scores in-process)
+SEARCH_SHARDS = int(os.environ.get('SEARCH_SHARDS', '0'))
+
+
+class InvalidParameterError(ValueError):
+    """Raised when a request parameter cannot be used"""
+
+
+class ServerBusyError(Exception):
+    """Raised when the scoring queue is full and a request is rejected"""
+
+
+class ScoringTimeoutError(Exception):
+    """Raised when scoring does not finish before the request deadline"""
+
+
+# Ranked result rows with their similarity and (optional) blended scores
+Ranking = namedtuple('Ranking', ['indices', 'similarities', 'scores'])
+
+
+class ScoringPool:
+    """Bounded worker pool that runs CPU-bound scoring off the request threads
+
+    At most `workers + queue_limit` jobs are admitted at once; anything beyond
+    that is rejected immediately instead of queueing behind slow queries. Each
+    job carries a deadline, and jobs that are still queued when it passes are
+    dropped without being scored.
+    """
+
+    def __init__(self, workers=SCORING_WORKERS, queue_limit=SCORING_QUEUE_LIMIT, timeout=SCORING_TIMEOUT):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scoring')
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+
+    def run(self, func, *args, **kwargs):
+        """Run `func` on a worker and wait for its result until the deadline"""
+        if not self._slots.acquire(blocking=False):
+            raise ServerBusyError("Too many requests in flight, please retry shortly")
+
+        deadline = time.monotonic() + self.timeout
+        try:
+            future = self._executor.submit(self._run_before_deadline, deadline, func, args, kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            future.cancel()
+            raise ScoringTimeoutError("Scoring did not finish in time, please retry shortly")
+
+    @staticmethod
+    def _run_before_deadline(deadline, func, args, kwargs):
+        # Skip work nobody is waiting for anymore
+        if time.monotonic() >= deadline:
+            raise ScoringTimeoutError("Request expired while queued")
+        return func(*args, **kwargs)
+
+
+# One discover page to fetch: `series` groups the pages of one listing
+DiscoverJob = namedtuple('DiscoverJob', ['series', 'page', 'path', 'params', 'content_type', 'tag', 'year'])
+DiscoverJob.key = property(lambda job: f"{job.series}:{job.page}")
+
+
+# A paginated TMDB listing the crawl planner can draw pages from
+CrawlQuery = namedtuple('CrawlQuery', ['series', 'path', 'params', 'content_type', 'tag', 'year',
+                                       'category', 'max_pages'])
+
+
+class CrawlPlanner:
+    """Chooses the next discover page that should yield the most wanted new titles
+    
+    Every listing starts with an optimistic prior for its own category. As
+    pages come back, the planner tracks each listing's total_results and how
+    many of its results were new and in a category whose quota is still
+    open, and always asks for the page with the highest expected yield.
+    Titles in categories that are already full are not detail-fetched, and
+    the crawl stops as soon as every quota is met, or once no listing is
+    expected to bring MIN_PAGE_YIELD wanted titles per page.
+    """
+    
+    def __init__(self, queries, quotas, counts, completed_jobs=(), max_outstanding=DISCOVER_WORKERS):
+        self.queries = list(queries)
+        self.quotas = quotas
+        self.counts = counts  # Persisted titles per category, updated by the caller
+        self.max_outstanding = max_outstanding
+        self._inflight = Counter()  # Titles admitted for detail fetching but not yet persisted
+        self._outstanding = 0  # Discover pages handed out but not yet fetched
+        self._state = {query.series: {'next_page': 1, 'total_pages': None, 'total_results': None,
+                                      'seen': 0, 'new': Counter()} for query in self.queries}
+        self._condition = threading.Condition()
+        self.requests = Counter()
+        self.skipped = Counter()
+        
+        # Pages finished before an interruption are not requested again
+        for query in self.queries:
+            state = self._state[query.series]
+            while f"{query.series}:{state['next_page']}" in completed_jobs:
+                state['next_page'] += 1
+    
+    @staticmethod
+    def category_of(result, content_type):
+        """Quota category of a discover result, from its listing data alone"""
+        if content_type == 'tv':
+            return 'web_series'
+        language = result.get('original_language', '')
+        if language == 'hi':
+            return 'bollywood'
+        elif language in SOUTH_INDIAN_LANGUAGES:
+            return 'south_indian'
+        return 'hollywood'
+    
+    def _is_open(self, category, include_inflight=True):
+        filled = self.counts[category] + (self._inflight[category] if include_inflight else 0)
+        return filled < self.quotas.get(category, 0)
+    
+    def _expected_yield(self, query):
+        state = self._state[query.series]
+        last_page = query.max_pages
+        if state['total_pages'] is not None:
+            last_page = min(last_page, state['total_pages'])
+        if state['next_page'] > last_page:
+            return 0.0
+        
+        page_size = RESULTS_PER_PAGE
+        if state['total_results'] is not None:
+            page_size = min(page_size, state['total_results'] - (state['next_page'] - 1) * RESULTS_PER_PAGE)
+        
+        # Laplace-smoothed share of results that were new and in an open category. A listing
+        # for a full category only counts with what it has brought for the open ones.
+        prior = 0.5 if self._is_open(query.category) else 0.0
+        wanted = sum(count for category, count in state['new'].items() if self._is_open(category))
+        return max(0, page_size) * (wanted + 2 * prior) / (state['seen'] + 2)
+    
+    def jobs(self):
+        """Yield DiscoverJobs until every quota is met or no listing is worth a request"""
+        while True:
+            with self._condition:
+                # Wait for feedback from pages in flight before planning the next one
+                while self._outstanding >= self.max_outstanding:
+                    self._condition.wait(1.0)
+                
+                if not any(self._is_open(category) for category in self.quotas):
+                    if not any(self._is_open(category, include_inflight=False) for category in self.quotas):
+                        return
+                    # Quotas look full only thanks to titles still in flight; see if they all land
+                    self._condition.wait(1.0)
+                    continue
+                
+                best, best_yield = None, 0.0
+                for query in self.queries:
+                    expected = self._expected_yield(query)
+                    if expected > best_yield:
+                        best, best_yield = query, expected
+                if best_yield < MIN_PAGE_YIELD:
+                    if self._outstanding or sum(self._inflight.values()):
+                        self._condition.wait(1.0)
+                        continue
+                    return
+                
+                state = self._state[best.series]
+                page = state['next_page']
+                state['next_page'] += 1
+                self._outstanding += 1
+                self.requests['discover'] += 1
+            
+            yield DiscoverJob(best.series, page, best.path, dict(best.params, page=page),
+                              best.content_type, best.tag, best.year)
+    
+    def record_page(self, series, data):
+        """Note a fetched page (data is None if the request failed)"""
+        with self._condition:
+            self._outstanding -= 1
+            if data is not None:
+                state = self._state[series]
+                state['total_pages'] = data.get('total_pages', 1)
+                state['total_results'] = data.get('total_results', state['total_pages'] * RESULTS_PER_PAGE)
+            self._condition.notify_all()
+    
+    def admit(self, series, category, is_new):
+        """Record one discover result; True if its details should be fetched"""
+        with self._condition:
+            state = self._state[series]
+            state['seen'] += 1
+            if not is_new:
+                self.skipped['known'] += 1
+                return False
+            state['new'][category] += 1
+            if not self._is_open(category):
+                self.skipped['quota_met'] += 1
+                return False
+            self._inflight[category] += 1
+            self.requests['detail'] += 1
+            return True
+    
+    def release(self, category):
+        """An admitted title left the pipeline (persisted, rejected or failed)"""
+        with self._condition:
+            self._inflight[category] -= 1
+            self._condition.notify_all()
+    
+    def report(self):
+        """Requests made and saved compared to walking every listing's page budget"""
+        fixed_schedule_pages = 0
+        for query in self.queries:
+            total_pages = self._state[query.series]['total_pages']
+            fixed_schedule_pages += min(query.max_pages, total_pages) if total_pages is not None else query.max_pages
+        return {
+            'discover_requests': self.requests['discover'],
+            'detail_requests': self.requests['detail'],
+            'fixed_schedule_discover_requests': fixed_schedule_pages,
+            'discover_requests_saved': max(0, fixed_schedule_pages - self.requests['discover']),
+            'detail_requests_saved': self.skipped['quota_met'],
+            'results_already_known': self.skipped['known'],
+        }
+
+
+class IngestionPipeline:
+    """Runs ingestion as stages connected by bounded queues
+    
+    `stages` is a list of (name, func, workers). Each stage has its own
+    worker threads; `func` takes one item and returns the items for the next
+    stage. A full queue blocks the stage feeding it, so a slow stage throttles
+    its producers instead of letting work pile up in memory.
+    
+    Every source job is tracked until all the items it produced have left the
+    pipeline, then `on_job_complete` is called with its key.
+    """
+    
+    _STOP = object()
+    
+    def __init__(self, stages, queue_size=PIPELINE_QUEUE_SIZE, on_job_complete=None):
+        self.stages = stages
+        self.on_job_complete = on_job_complete
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self._stats = {name: {'processed': 0, 'emitted': 0, 'busy_seconds': 0.0} for name, _, _ in stages}
+        self._live_workers = [workers for _, _, workers in stages]
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._started = None
+    
+    def run(self, jobs):
+        """Feed `jobs` through every stage and wait until the pipeline drains"""
+        self._started = time.monotonic()
+        threads = []
+        for index, (name, _, workers) in enumerate(self.stages):
+            for n in range(workers):
+                thread = threading.Thread(target=self._work, args=(index,), name=f"ingest-{name}-{n}", daemon=True)
+                thread.start()
+                threads.append(thread)
+        
+        finished = threading.Event()
+        monitor = threading.Thread(target=self._report, args=(finished,), daemon=True)
+        monitor.start()
+        
+        for job in jobs:
+            with self._lock:
+                self._pending[job.key] = 1
+            self._queues[0].put((job.key, job))
+        for _ in range(self.stages[0][2]):
+            self._queues[0].put(self._STOP)
+        
+        for thread in threads:
+            thread.join()
+        finished.set()
+        return self.stats()
+    
+    def stats(self):
+        """Per-stage counters, throughput and current input queue depth"""
+        elapsed = max(time.monotonic() - self._started, 1e-9) if self._started else 0
+        stats = {}
+        for (name, _, workers), inbox in zip(self.stages, self._queues):
+            stage = dict(self._stats[name])
+            stage['workers'] = workers
+            stage['queue_depth'] = inbox.qsize()
+            stage['per_second'] = round(stage['processed'] / elapsed, 2) if elapsed else 0.0
+            stage['busy_seconds'] = round(stage['busy_seconds'], 2)
+            stats[name] = stage
+        return stats
+    
+    def _report(self, finished):
+        while not finished.wait(PIPELINE_STATS_INTERVAL):
+            print("Pipeline: " + " | ".join(
+                f"{name} {stage['processed']} done ({stage['per_second']}/s), queue {stage['queue_depth']}"
+                for name, stage in self.stats().items()))
+    
+    def _work(self, index):
+        name, func, _ = self.stages[index]
+        inbox = self._queues[index]
+        outbox = self._queues[index + 1] if index + 1 < len(self._queues) else None
+        
+        while True:
+            item = inbox.get()
+            if item is self._STOP:
+                with self._lock:
+                    self._live_workers[index] -= 1
+                    last_worker = self._live_workers[index] == 0
+                # The last worker out tells the next stage no more input is coming
+                if last_worker and outbox is not None:
+                    for _ in range(self.stages[index + 1][2]):
+                        outbox.put(self._STOP)
+                return
+            
+            job_key, payload = item
+            started = time.monotonic()
+            try:
+                outputs = list(func(payload) or [])
+                if outbox is None:
+                    outputs = []  # Nothing downstream of the last stage
+            except Exception as e:
+                print(f"Error in {name} stage for {job_key}: {e}")
+                outputs = []
+            
+            with self._lock:
+                stage = self._stats[name]
+                stage['processed'] += 1
+                stage['emitted'] += len(outputs)
+                stage['busy_seconds'] += time.monotonic() - started
+                # Account for outputs before handing them on, so a job can't look finished early
+                self._pending[job_key] += len(outputs) - 1
+                job_done = self._pending[job_key] == 0
+                if job_done:
+                    del self._pending[job_key]
+            
+            for output in outputs:
+                outbox.put((job_key, output))
+            if job_done and self.on_job_complete is not None:
+                self.on_job_complete(job_key)
+
+
+class CatalogWriter:
+    """Streams records into the catalog store, one JSON record per line
+    
+    The file is still a single JSON array, so it loads with json.load, but it
+    can also be read back one record at a time by iter_catalog. Records go to
+    a temporary file that replaces `path` only when the writer closes cleanly.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = None
+    
+    def __enter__(self):
+        self._file = open(self.path + '.tmp', 'w', encoding='utf-8')
+        self._file.write('[')
+        return self
+    
+    def write(self, record):
+        self._file.write('\n' if self.count == 0 else ',\n')
+        self._file.write(json.dumps(record, ensure_ascii=False))
+        self.count += 1
+    
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            self._file.close()
+            os.remove(self.path + '.tmp')
+            return False
+        self._file.write('\n]\n')
+        self._file.close()
+        os.replace(self.path + '.tmp', self.path)
+        return False
+
+
+def iter_catalog(path):
+    """Yield catalog records one at a time
+    
+    Files written by CatalogWriter are streamed line by line; any other JSON
+    array (such as an older indented catalog) is loaded whole.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        first = f.readline().strip()
+        second = f.readline().strip()
+        if first != '[' or not (second.startswith('{') and second.rstrip(',').endswith('}')):
+            f.seek(0)
+            yield from json.load(f)
+            return
+        
+        line = second
+        while line and line != ']':
+            yield json.loads(line.rstrip(','))
+            line = f.readline().strip()
+
+
+def iter_json_lines(path):
+    """Stream records from a JSON Lines file, gzipped if the name ends in .gz"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"Skipping malformed line {line_number} in {path}")
+
+
+class SpellCorrector:
+    """Symmetric-delete (SymSpell) dictionary for correcting query words
+    
+    Every dictionary word is indexed under all strings reachable by deleting
+    up to max_distance characters from its prefix. A query word only needs
+    its own deletes looked up, so the candidates come from a handful of dict
+    hits whatever the dictionary size; just those candidates are checked with
+    a real edit distance.
+    """
+    
+    def __init__(self, max_distance=SPELL_MAX_EDIT_DISTANCE, prefix_length=SPELL_PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.words = Counter()  # Dictionary word -> frequency, used to break ties
+        self.known = set(ENGLISH_STOP_WORDS)  # Words accepted as spelled, but never suggested
+        self._deletes = {}  # Delete string -> [dictionary words]
+    
+    def _edits(self, word):
+        """All strings reachable from `word` by up to max_distance deletes, including itself"""
+        edits = {word}
+        frontier = {word}
+        for _ in range(self.max_distance):
+            frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+            edits |= frontier
+        return edits
+    
+    def add(self, word, count=1):
+        if word not in self.words:
+            for delete in self._edits(word[:self.prefix_length]):
+                self._deletes.setdefault(delete, []).append(word)
+        self.words[word] += count
+    
+    def add_known(self, word):
+        self.known.add(word)
+    
+    @staticmethod
+    def distance(a, b, limit):
+        """Optimal string alignment distance, or limit + 1 once it is exceeded"""
+        if abs(len(a) - len(b)) > limit:
+            return limit + 1
+        previous2, previous = None, list(range(len(b) + 1))
+        for i in range(1, len(a) + 1):
+            current = [i] + [0] * len(b)
+            for j in range(1, len(b) + 1):
+                cost = a[i - 1] != b[j - 1]
+                current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+                if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                    current[j] = min(current[j], previous2[j - 2] + 1)
+            if min(current) > limit:
+                return limit + 1
+            previous2, previous = previous, current
+        return previous[-1]
+    
+    def lookup(self, word):
+        """Return the closest dictionary word within max_distance, or None
+        
+        Words of up to four letters only accept a single edit, since two
+        edits turn most short words into some other word.
+        """
+        limit = 1 if len(word) <= 4 else self.max_distance
+        candidates = set()
+        for delete in self._edits(word[:self.prefix_length]):
+            candidates.update(self._deletes.get(delete, ()))
+        
+        best, best_key = None, None
+        for candidate in candidates:
+            distance = self.distance(word, candidate, limit)
+            if distance > limit:
+                continue
+            key = (distance, -self.words[candidate])
+            if best_key is None or key < best_key:
+                best, best_key = candidate, key
+        return best
+    
+    def split(self, word):
+        """Split `word` into two dictionary words, e.g. shahrukh -> shah rukh"""
+        best, best_count = None, 0
+        for i in range(SPELL_MIN_WORD_LENGTH - 1, len(word) - SPELL_MIN_WORD_LENGTH + 2):
+            left, right = word[:i], word[i:]
+            count = min(self.words.get(left, 0), self.words.get(right, 0))
+            if count > best_count:
+                best, best_count = f"{left} {right}", count
+        return best
+    
+    def correct_word(self, word):
+        if word in self.words or word in self.known or len(word) < SPELL_MIN_WORD_LENGTH or not word.isalpha():
+            return word
+        return self.lookup(word) or self.split(word) or word
+    
+    def correct(self, text):
+        """Return `text` with unknown words replaced by their corrections"""
+        def replace(match):
+            word = match.group()
+            corrected = self.correct_word(word.lower())
+            return word if corrected == word.lower() else corrected
+        return re.sub(r'\w+', replace, text)
+
+
+class NearDuplicateIndex:
+    """MinHash signatures bucketed with LSH to find near-duplicate catalog entries
+    
+    Each record is reduced to a set of shingles (title tokens, overview word
+    trigrams, people and year), summarised by a MinHash signature and split
+    into bands. Only records sharing a band bucket are compared, so an insert
+    costs roughly the same regardless of catalog size.
+    """
+    
+    _PRIME = (1 << 31) - 1
+    
+    def __init__(self, num_perm=MINHASH_PERMUTATIONS, bands=LSH_BANDS, threshold=NEAR_DUPLICATE_THRESHOLD):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = np.random.RandomState(1)
+        self._a = rng.randint(1, self._PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, self._PRIME, size=num_perm).astype(np.uint64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self._signatures = {}  # catalog key -> signature
+        self._buckets = {}  # (band, band bytes) -> [catalog keys]
+    
+    @staticmethod
+    def shingles(record):
+        """Order-insensitive features describing a record's content"""
+        def words(text):
+            return re.sub(r'[^\w\s]', ' ', (text or '').lower()).split()
+        
+        shingles = {f"t:{word}" for word in words(record.get('original_title')) + words(record.get('title'))}
+        overview = words(record.get('overview'))
+        shingles.update(f"o:{' '.join(overview[i:i + 3])}" for i in range(max(0, len(overview) - 2)))
+        people = list(record.get('cast', [])) + list(record.get('creators', [])) + [record.get('director') or '']
+        shingles.update(f"p:{' '.join(words(name))}" for name in people if name)
+        if record.get('release_date'):
+            shingles.add(f"y:{record['release_date'][:4]}")
+        return shingles
+    
+    def signature(self, shingles):
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+        hashes %= self._PRIME
+        # (a * x + b) mod p for every permutation and shingle, minimised per permutation
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % self._PRIME).min(axis=1).astype(np.uint32)
+    
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+    
+    def find(self, record):
+        """Return (key, similarity) of the closest indexed near-duplicate, or None"""
+        shingles = self.shingles(record)
+        if len(shingles) < 3:  # Too little content to judge
+            return None
+        signature = self.signature(shingles)
+        
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+        
+        best = None
+        for key in candidates:
+            similarity = float(np.mean(self._signatures[key] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
+    
+    def add(self, key, record):
+        shingles = self.shingles(record)
+        if len(shingles) < 3:
+            return
+        signature = self.signature(shingles)
+        self._signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(key)
+    
+    @staticmethod
+    def report_entry(key, record, match):
+        """Duplicate report line for a record rejected as a near-duplicate (`match` from find)"""
+        original_key, similarity = match
+        return {
+            'content_type': key[0],
+            'id': key[1],
+            'title': record.get('title', ''),
+            'duplicate_of': {'content_type': original_key[0], 'id': original_key[1]},
+            'similarity': round(similarity, 3),
+        }
+
+
+def load_duplicate_report():
+    """Read the near-duplicates rejected by earlier runs from DUPLICATE_REPORT_FILE"""
+    if not os.path.exists(DUPLICATE_REPORT_FILE):
+        return []
+    try:
+        with open(DUPLICATE_REPORT_FILE, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable {DUPLICATE_REPORT_FILE}: {e}")
+        return []
+    return [entry for entry in report if isinstance(entry, dict) and 'id' in entry] if isinstance(report, list) else []
+
+
+def duplicate_report_key(entry):
+    """Catalog key of the title a duplicate report entry rejected"""
+    return (entry.get('content_type', 'movie'), entry['id'])
+
+
+def save_duplicate_report(report):
+    """Write rejected near-duplicates to DUPLICATE_REPORT_FILE
+    
+    Callers pass the entries of earlier runs along with their own, so the
+    file keeps growing with the catalog instead of listing one run only.
+    """
+    with open(DUPLICATE_REPORT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+# Row shard attached by each scatter-gather worker process
+_shard = None
+
+
+def _attach_shard(blocks, shape, row_offset):
+    """Worker initializer: map the shard's CSR arrays from shared memory"""
+    global _shard
+    handles = {}
+    arrays = {}
+    for name, (block_name, dtype, length) in blocks.items():
+        handles[name] = shared_memory.SharedMemory(name=block_name)
+        arrays[name] = np.ndarray((length,), dtype=dtype, buffer=handles[name].buf)
+    matrix = sparse.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=shape, copy=False)
+    _shard = (matrix, row_offset, handles)
+
+
+def _shard_top_k(query_indices, query_data, top_n, exclude):
+    """Score one shard against a query and return its local top-n as global rows"""
+    matrix, row_offset, _ = _shard
+    query = sparse.csr_matrix((query_data, query_indices, [0, len(query_indices)]), shape=(1, matrix.shape[1]))
+    scores = (matrix @ query.T).toarray().ravel()
+    
+    local_exclude = [i - row_offset for i in exclude if row_offset <= i < row_offset + matrix.shape[0]]
+    if local_exclude:
+        scores[local_exclude] = -np.inf
+    
+    top_n = min(top_n, len(scores))
+    if top_n <= 0:
+        return np.array([], dtype=int), np.array([])
+    local = np.argpartition(-scores, top_n - 1)[:top_n]
+    local = local[np.isfinite(scores[local])]
+    return local + row_offset, scores[local]
+
+
+class ShardedIndex:
+    """Row-sharded copy of the TF-IDF matrix scored by a set of worker processes
+    
+    Each shard's CSR arrays live in shared memory and are attached once by a
+    dedicated single-process executor. A query is scattered to every shard,
+    each returns its local top-k, and the coordinator merges them.
+    """
+    
+    def __init__(self, matrix, num_shards):
+        matrix = sparse.csr_matrix(matrix)
+        self.num_shards = max(1, min(num_shards, matrix.shape[0]))
+        self._blocks = []
+        self._executors = []
+        context = multiprocessing.get_context('spawn')
+        
+        bounds = np.linspace(0, matrix.shape[0], self.num_shards + 1).astype(int)
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            shard = matrix[start:stop]
+            blocks = {}
+            for name in ('data', 'indices', 'indptr'):
+                array = getattr(shard, name)
+                block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+                np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+                self._blocks.append(block)
+                blocks[name] = (block.name, array.dtype.str, len(array))
+            
+            self._executors.append(ProcessPoolExecutor(
+                max_workers=1, mp_context=context,
+                initializer=_attach_shard, initargs=(blocks, shard.shape, int(start))))
+        
+        print(f"Scoring sharded across {self.num_shards} worker processes")
+        atexit.register(self.close)
+    
+    def top_k(self, query_vector, top_n, exclude=None):
+        """Return (rows, scores) of the top_n rows by dot product, best first"""
+        query_vector = sparse.csr_matrix(query_vector)
+        exclude = [int(i) for i in exclude] if exclude is not None else []
+        futures = [executor.submit(_shard_top_k, query_vector.indices, query_vector.data, top_n, exclude)
+                   for executor in self._executors]
+        
+        parts = [future.result() for future in futures]
+        rows = np.concatenate([part[0] for part in parts])
+        scores = np.concatenate([part[1] for part in parts])
+        order = np.argsort(-scores, kind='stable')[:top_n]
+        return rows[order], scores[order]
+    
+    def close(self):
+        for executor in self._executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+        for block in self._blocks:
+            try:
+                block.close()
+                block.unlink()
+            except FileNotFoundError:
+                pass
+        self._executors = []
+        self._blocks = []
+
+
+class HashedTfidfVectorizer:
+    """TF-IDF over a hashed vocabulary, fitted incrementally in bounded memory
+    
+    partial_fit only accumulates term and document counts per hash bucket,
+    so the fit never holds the documents or a term dictionary. finalize()
+    keeps the max_features most frequent buckets (as TfidfVectorizer's
+    max_features does) with smoothed IDF weights. Terms sharing a bucket are
+    merged, which is the price of the bounded vocabulary.
+    """
+    
+    def __init__(self, max_features=TFIDF_MAX_FEATURES, n_features=HASHING_FEATURES,
+                 ngram_range=(1, 2), stop_words='english'):
+        self.max_features = max_features
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.stop_words = stop_words
+        self._hasher = HashingVectorizer(n_features=n_features, ngram_range=ngram_range, stop_words=stop_words,
+                                         alternate_sign=False, norm=None)
+        self._analyzer = self._hasher.build_analyzer()
+        self._term_counts = np.zeros(n_features)
+        self._doc_counts = np.zeros(n_features, dtype=np.int64)
+        self.n_documents = 0
+        self.buckets = None  # Kept hash buckets, in column order
+        self.idf_ = None
+        self.vocabulary_ = {}  # Observed term -> column, filled in by record_terms
+    
+    def get_params(self):
+        return {'hashed': True, 'max_features': self.max_features, 'n_features': self.n_features,
+                'ngram_range': self.ngram_range, 'stop_words': self.stop_words}
+    
+    def partial_fit(self, documents):
+        counts = self._hasher.transform(documents)
+        self._term_counts += np.asarray(counts.sum(axis=0)).ravel()
+        self._doc_counts += np.bincount(counts.indices, minlength=self.n_features)
+        self.n_documents += len(documents)
+    
+    def finalize(self):
+        kept = np.flatnonzero(self._term_counts)
+        if len(kept) > self.max_features:
+            kept = kept[np.argsort(-self._term_counts[kept], kind='stable')[:self.max_features]]
+        self.buckets = np.sort(kept)
+        self.idf_ = np.log((1 + self.n_documents) / (1 + self._doc_counts[self.buckets])) + 1
+        self._columns = np.full(self.n_features, -1, dtype=np.int64)
+        self._columns[self.buckets] = np.arange(len(self.buckets))
+        self._term_counts = self._doc_counts = None
+    
+    def transform(self, documents):
+        counts = self._hasher.transform(documents)[:, self.buckets]
+        return normalize(sparse.csr_matrix(counts.multiply(self.idf_)))
+    
+    def record_terms(self, documents):
+        """Add the kept terms seen in `documents` to vocabulary_"""
+        terms = {term for document in documents for term in self._analyzer(document)}
+        for term in terms.difference(self.vocabulary_):
+            column = self._columns[abs(murmurhash3_32(term, seed=0)) % self.n_features]
+            if column >= 0:
+                self.vocabulary_[term] = int(column)
+
+
+def write_chunked_csr(path, chunks, num_columns):
+    """Append CSR row chunks to files under `path` and return the matrix memory-mapped
+    
+    Only one chunk is held in memory at a time; the returned matrix reads its
+    data and column indices from disk on demand and only keeps the row
+    pointers in memory.
+    """
+    os.makedirs(path, exist_ok=True)
+    dtypes = {'data': np.float64, 'indices': np.int32}
+    indptr = [np.zeros(1, dtype=np.int64)]
+    nnz = 0
+    with open(os.path.join(path, 'data.bin.tmp'), 'wb') as data_file, \
+            open(os.path.join(path, 'indices.bin.tmp'), 'wb') as indices_file:
+        for chunk in chunks:
+            chunk = sparse.csr_matrix(chunk)
+            chunk.sort_indices()
+            data_file.write(chunk.data.astype(dtypes['data']).tobytes())
+            indices_file.write(chunk.indices.astype(dtypes['indices']).tobytes())
+            indptr.append(chunk.indptr[1:].astype(np.int64) + nnz)
+            nnz += chunk.nnz
+    
+    indptr = np.concatenate(indptr)
+    np.save(os.path.join(path, 'indptr.npy'), indptr)
+    arrays = {}
+    for name, dtype in dtypes.items():
+        final = os.path.join(path, f"{name}.bin")
+        os.replace(final + '.tmp', final)
+        # np.memmap cannot map an empty file
+        arrays[name] = np.memmap(final, dtype=dtype, mode='r', shape=(nnz,)) if nnz else np.zeros(0, dtype=dtype)
+    
+    if nnz < 2 ** 31:
+        indptr = indptr.astype(np.int32)  # Matches the indices so scipy does not upcast (and copy) them
+    return sparse.csr_matrix((arrays['data'], arrays['indices'], indptr), shape=(len(indptr) - 1, num_columns))
+
+
 class MovieRecommender:
     def __init__(self):
         self.movies = []
         self.tfidf_matrix = None
         self.vectorizer = None
+        self.id_to_index = {}  # (content_type, ID) -> row in tfidf_matrix
+        self.catalog_version = None  # Changes whenever the catalog or model is rebuilt
+        self.catalog_built_at = None
+        self.features = {}  # Per-title blend features, each scaled to 0..1
+        self.shards = None  # ShardedIndex when SEARCH_SHARDS > 1
+        self.field_matrix = None  # Per-field TF-IDF blocks side by side, see _prepare_field_index
+        self.spell = None  # SpellCorrector over the model vocabulary and people/title words
+        self.person_ids = {}  # Normalised person name -> column in people_matrix
+        self.people_matrix = None  # Title x person incidence, weighted and L2-normalised per row
+        self.people_neighbours = None  # (rows, scores) arrays of each title's top PEOPLE_NEIGHBOURS
         self.api_key = self._load_api_key()
-        self.unique_movie_ids = set()  # To track unique movies
+        self.unique_movie_ids = set()  # (content_type, id) keys of catalog entries
+        self.duplicate_ids = set()  # Keys rejected as near-duplicates of an existing entry
+        self.duplicate_report = []
+        self._near_duplicates = None  # NearDuplicateIndex, built on first insert
         
         # Load existing data or fetch new data
-        if os.path.exists(DATA_FILE):
+        if os.path.exists(CHECKPOINT_FILE):
+            print("Found an interrupted crawl, resuming...")
+            if os.path.exists(DATA_FILE):
+                self._load_data()
+            self._fetch_and_process_data(resume=True)
+        elif os.path.exists(DATA_FILE):
             self._load_data()
             # If loaded data is less than target, fetch more
             if len(self.movies) < TARGET_MOVIE_COUNT:
@@ -70,69 +1006,139 @@ class MovieRecommender:
     def _load_data(self):
         """Load movie data from JSON file"""
         print("Loading existing movie data...")
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            self.movies = json.load(f)
-        # Populate the unique IDs set
-        self.unique_movie_ids = set(movie['id'] for movie in self.movies)
-        print(f"Loaded {len(self.movies)} movies")
-    
-    def _fetch_and_process_data(self):
-        """Fetch a large dataset of movies from TMDB API using multiple methods"""
+        self.movies = list(iter_catalog(DATA_FILE))
+        # Populate the unique IDs set (movie and TV IDs live in separate namespaces)
+        self.unique_movie_ids = set(self._catalog_key(movie.get('content_type', 'movie'), movie['id'])
+                                    for movie in self.movies)
+        # Titles rejected by earlier runs stay rejected, so they are not detail-fetched again
+        self.duplicate_report = load_duplicate_report()
+        self.duplicate_ids = set(duplicate_report_key(entry) for entry in self.duplicate_report)
+        print(f"Loaded {len(self.movies)} movies ({len(self.duplicate_ids)} known near-duplicates)")
+    
+    def _fetch_and_process_data(self, resume=False):
+        """Fetch a large dataset of movies from TMDB API using multiple methods
+        
+        Runs as a staged pipeline: discover -> dedupe -> detail fetch ->
+        document build -> persist, with the TF-IDF index built once the
+        pipeline drains. A CrawlPlanner picks which listing page to fetch
+        next for the unmet category quotas. Progress is checkpointed, so an
+        interrupted crawl resumes with the discover pages it had not finished.
+        """
         print(f"Fetching {TARGET_MOVIE_COUNT} movies from TMDB API...")
-        self.movies = []
-        self.unique_movie_ids = set()
+        if not resume:
+            self.movies = []
+            self.unique_movie_ids = set()
+            self.duplicate_ids = set()
+            self.duplicate_report = []
+            self._near_duplicates = None
+        
+        completed_jobs = self._load_checkpoint() if resume else set()
+        self._completed_jobs = set(completed_jobs)
+        self._failed_jobs = set()  # Discover pages whose fetch failed; retried by the next resume
+        self._completed_lock = threading.Lock()
+        self._queued_ids = set()
+        self._persisted_since_checkpoint = 0
+        self._category_counts = Counter(self._content_category(movie) for movie in self.movies)
         
-        # Get list of all available genres
-        genres = self._get_genres()
+        quotas = {
+            'hollywood': HOLLYWOOD_COUNT,
+            'bollywood': BOLLYWOOD_COUNT,
+            'south_indian': SOUTH_INDIAN_COUNT,
+            'web_series': WEB_SERIES_COUNT,
+        }
+        self._planner = CrawlPlanner(self._crawl_queries(), quotas, self._category_counts, completed_jobs)
         
         # Track progress
         start_time = time.time()
         
-        # Track movie counts by category
-        hollywood_count = 0
-        bollywood_count = 0
-        south_indian_count = 0
-        web_series_count = 0
+        pipeline = IngestionPipeline([
+            ('discover', self._discover_stage, DISCOVER_WORKERS),
+            ('dedupe', self._dedupe_stage, 1),
+            ('detail', self._detail_stage, DETAIL_FETCH_WORKERS),
+            ('document', self._document_stage, 1),
+            ('persist', self._persist_stage, 1),
+        ], on_job_complete=self._complete_job)
         
-        # 1. Fetch Hollywood/International movies first (popular movies)
-        print(f"Phase 1: Fetching Hollywood/International movies (target: {HOLLYWOOD_COUNT})...")
+        stage_stats = pipeline.run(self._planner.jobs())
         
-        # 1.1 Fetch popular movies
-        self._fetch_from_endpoint("movie/popular", pages=20)
-        hollywood_count = len(self.unique_movie_ids)
-        self._save_progress("Popular Movies")
+        # Final save
+        self._save_catalog()
+        self._save_duplicate_report()
+        if self._failed_jobs:
+            # Keep a checkpoint so the next start resumes and retries the failed pages
+            self._save_checkpoint()
+            print(f"{len(self._failed_jobs)} discover pages failed and will be retried on the next start")
+        elif os.path.exists(CHECKPOINT_FILE):
+            os.remove(CHECKPOINT_FILE)
+            
+        elapsed_time = (time.time() - start_time) / 60
+        plan = self._planner.report()
         
-        # 1.2 Fetch top-rated movies
-        self._fetch_from_endpoint("movie/top_rated", pages=20)
-        hollywood_count = len(self.unique_movie_ids)
-        self._save_progress("Top Rated Movies")
+        # Print summary
+        print("\n=== FINAL SUMMARY ===")
+        print(f"Total movies/shows in dataset: {len(self.movies)}")
+        print(f"- Hollywood/International: {self._category_counts['hollywood']}")
+        print(f"- Bollywood: {self._category_counts['bollywood']}")
+        print(f"- South Indian: {self._category_counts['south_indian']}")
+        print(f"- Web Series: {self._category_counts['web_series']}")
+        for name, stage in stage_stats.items():
+            print(f"- Stage {name}: {stage['processed']} items, {stage['per_second']}/s, "
+                  f"{stage['busy_seconds']}s busy across {stage['workers']} worker(s)")
+        print(f"- Requests: {plan['discover_requests']} discover pages "
+              f"(fixed schedule: {plan['fixed_schedule_discover_requests']}, saved {plan['discover_requests_saved']}), "
+              f"{plan['detail_requests']} detail lookups (saved {plan['detail_requests_saved']} for full quotas)")
+        print(f"Fetched and saved in {elapsed_time:.2f} minutes")
+    
+    @staticmethod
+    def _content_category(movie):
+        """Quota category a catalog record counts towards"""
+        language = movie.get('language', 'unknown')
+        if movie.get('content_type', 'movie') == 'tv':
+            return 'web_series'
+        elif language == 'hi':
+            return 'bollywood'
+        elif language in SOUTH_INDIAN_LANGUAGES:
+            return 'south_indian'
+        return 'hollywood'
+    
+    @staticmethod
+    def _category_tag(record):
+        """Document tags the crawl adds for the listing a title comes from"""
+        if record.get('content_type') == 'tv':
+            return " web series tv show"
+        language = record.get('language', '')
+        if language == 'hi':
+            return " bollywood hindi indian"
+        if language in SOUTH_INDIAN_LANGUAGES:
+            return f" {SOUTH_INDIAN_LANGUAGES[language].lower()} south indian" * 2
+        return ""
+    
+    def _crawl_queries(self):
+        """Listings the crawl planner may draw pages from, with their page budgets"""
+        queries = [
+            CrawlQuery("popular", "movie/popular", {}, 'movie', '', None, 'hollywood', 20),
+            CrawlQuery("top_rated", "movie/top_rated", {}, 'movie', '', None, 'hollywood', 20),
+        ]
         
-        # 1.3 Fetch movies by year (recent years first)
+        # Movies by year (recent years first, 30 years back)
         current_year = datetime.now().year
-        for year in range(current_year, current_year - 30, -1):  # 30 years back
-            if hollywood_count >= HOLLYWOOD_COUNT:
-                break
-                
-            # Make sure we're specifically getting movies from this year
-            self._fetch_by_year(year, max_pages=3, strict_year=True)
-            hollywood_count = len(self.unique_movie_ids)
-            self._save_progress(f"Year {year}")
-        
-        # 1.4 Fetch movies by genre
-        for genre in genres:
-            if hollywood_count >= HOLLYWOOD_COUNT:
-                break
-            self._fetch_by_genre(genre['id'], genre['name'], max_pages=5)
-            hollywood_count = len(self.unique_movie_ids)
-            self._save_progress(f"Genre {genre['name']}")
+        for year in range(current_year, current_year - 30, -1):
+            queries.append(CrawlQuery(f"year-{year}", "discover/movie",
+                                      {'primary_release_year': year, 'year': year, 'sort_by': 'popularity.desc'},
+                                      'movie', '', year, 'hollywood', 3))
+        
+        # Movies by genre
+        for genre in self._get_genres():
+            queries.append(CrawlQuery(f"genre-{genre['id']}", "discover/movie",
+                                      {'with_genres': genre['id'], 'sort_by': 'popularity.desc'},
+                                      'movie', f" {genre['name'].lower()}", None, 'hollywood', 5))
         
-        # 1.5 Fetch by language (focus on English)
-        if hollywood_count < HOLLYWOOD_COUNT:
-            self._fetch_by_language("en", max_pages=20)
-            hollywood_count = len(self.unique_movie_ids)
-            self._save_progress("English language movies")
+        # By language (focus on English)
+        queries.append(CrawlQuery("language-en", "discover/movie",
+                                  {'with_original_language': 'en', 'sort_by': 'popularity.desc'},
+                                  'movie', '', None, 'hollywood', 20))
         
-        # 1.6 Fetch by top studios
+        # By top studios
         top_studios = [
             420,   # Marvel Studios
             2,     # Disney
@@ -144,206 +1150,159 @@ class MovieRecommender:
             4171,  # Pixar
             41,    # Dreamworks
         ]
-        
         for studio_id in top_studios:
-            if hollywood_count >= HOLLYWOOD_COUNT:
-                break
-            self._fetch_by_company(studio_id, max_pages=5)
-            hollywood_count = len(self.unique_movie_ids)
-            self._save_progress(f"Studio {studio_id}")
-        
-        # 2. Fetch Bollywood movies (Hindi cinema)
-        print(f"Phase 2: Fetching Bollywood movies (target: {BOLLYWOOD_COUNT})...")
-        bollywood_start_count = len(self.unique_movie_ids)
-        bollywood_fetched = 0
-        
-        # 2.1 Using discover endpoint with Hindi language parameter
-        page = 1
-        while bollywood_fetched < BOLLYWOOD_COUNT:
-            url = f"{TMDB_BASE_URL}/discover/movie?api_key={self.api_key}&with_original_language=hi&page={page}&sort_by=popularity.desc"
-            try:
-                response = requests.get(url)
-                if response.status_code == 200:
-                    data = response.json()
-                    results = data.get('results', [])
-                    if not results:
-                        break
-                        
-                    before_count = len(self.unique_movie_ids)
-                    self._process_movie_results(results, is_bollywood=True)
-                    after_count = len(self.unique_movie_ids)
-                    bollywood_fetched += (after_count - before_count)
-                        
-                    self._save_progress(f"Bollywood movies (page {page})")
-                    page += 1
-                    time.sleep(0.5)  # Prevent rate limiting
-                        
-                    # Break if we've reached end of results
-                    if page > data.get('total_pages', 1) or page > 100:  # Allow up to 100 pages
-                        break
-                else:
-                    print(f"Error {response.status_code} when fetching Bollywood movies")
-                    time.sleep(2)
-            except Exception as e:
-                print(f"Exception while fetching Bollywood movies: {e}")
-                time.sleep(2)
-                
-        print(f"Fetched {bollywood_fetched} Bollywood movies")
-        
-        # 2.2 Fetch by popular Bollywood studios/production companies
-        if bollywood_fetched < BOLLYWOOD_COUNT:
-            bollywood_studios = [
-                1569,   # Yash Raj Films
-                2515,   # Dharma Productions
-                1913,   # Excel Entertainment
-                5626,   # Red Chillies Entertainment
-                1884,   # UTV Motion Pictures
-                3538,   # T-Series
-                7294,   # Viacom18 Studios
-                128250, # Aamir Khan Productions
-                156782  # Sanjay Leela Bhansali Productions
-            ]
-            
-            for studio_id in bollywood_studios:
-                if bollywood_fetched >= BOLLYWOOD_COUNT:
-                    break
-                    
-                # Use a more targeted approach that combines company and language
-                url = f"{TMDB_BASE_URL}/discover/movie?api_key={self.api_key}&with_companies={studio_id}&with_original_language=hi&page=1&sort_by=popularity.desc"
-                try:
-                    response = requests.get(url)
-                    if response.status_code == 200:
-                        data = response.json()
-                        total_pages = min(data.get('total_pages', 1), 10)  # Limit to 10 pages per studio
-                        
-                        for page in range(1, total_pages + 1):
-                            if page > 1:  # Skip first page as we already fetched it
-                                url = f"{TMDB_BASE_URL}/discover/movie?api_key={self.api_key}&with_companies={studio_id}&with_original_language=hi&page={page}&sort_by=popularity.desc"
-                                response = requests.get(url)
-                                if response.status_code != 200:
-                                    continue
-                                data = response.json()
-                                
-                            before_count = len(self.unique_movie_ids)
-                            self._process_movie_results(data.get('results', []), is_bollywood=True)
-                            after_count = len(self.unique_movie_ids)
-                            bollywood_fetched += (after_count - before_count)
-                            
-                            self._save_progress(f"Bollywood studio {studio_id} (page {page})")
-                            time.sleep(0.5)
-                except Exception as e:
-                    print(f"Error fetching from Bollywood studio {studio_id}: {e}")
-        
-        # 3. Fetch South Indian movies (Tamil, Telugu, Malayalam, Kannada)
-        print(f"Phase 3: Fetching South Indian movies (target: {SOUTH_INDIAN_COUNT})...")
-        south_indian_fetched = 0
-        south_indian_languages = {
-            "ta": "Tamil", 
-            "te": "Telugu", 
-            "ml": "Malayalam", 
-            "kn": "Kannada"
-        }
-                
-        # 3.1 Fetch by South Indian languages
-        for language_code, language_name in south_indian_languages.items():
-            language_target = SOUTH_INDIAN_COUNT // len(south_indian_languages)
-            language_count = 0
-            page = 1
-                    
-            while language_count < language_target and south_indian_fetched < SOUTH_INDIAN_COUNT:
-                url = f"{TMDB_BASE_URL}/discover/movie?api_key={self.api_key}&with_original_language={language_code}&page={page}&sort_by=popularity.desc"
-                try:
-                    response = requests.get(url)
-                    if response.status_code == 200:
-                        data = response.json()
-                        results = data.get('results', [])
-                        if not results:
-                            break
-                                
-                        before_count = len(self.unique_movie_ids)
-                        # Add tag for the language to make searching easier
-                        for result in results:
-                            result['language_tag'] = language_name.lower() + " south indian"
-                            
-                        self._process_movie_results(results, is_south_indian=True, language=language_name)
-                        after_count = len(self.unique_movie_ids)
-                        language_count += (after_count - before_count)
-                        south_indian_fetched += (after_count - before_count)
-                                
-                        self._save_progress(f"{language_name} movies (page {page})")
-                        page += 1
-                        time.sleep(0.5)
-                                
-                        if page > data.get('total_pages', 1) or page > 20:  # Increased to 20 pages to get more results
-                            break
-                    else:
-                        print(f"Error {response.status_code} when fetching {language_name} movies")
-                        time.sleep(2)
-                except Exception as e:
-                    print(f"Exception while fetching {language_name} movies: {e}")
-                    time.sleep(2)
+            queries.append(CrawlQuery(f"studio-{studio_id}", "discover/movie",
+                                      {'with_companies': studio_id, 'sort_by': 'popularity.desc'},
+                                      'movie', '', None, 'hollywood', 5))
         
-        # 4. Fetch web series (TV shows)
-        print(f"Phase 4: Fetching web series (target: {WEB_SERIES_COUNT})...")
-        web_series_fetched = 0
+        # Bollywood movies (Hindi cinema)
+        bollywood_tag = " bollywood hindi indian"
+        queries.append(CrawlQuery("language-hi", "discover/movie",
+                                  {'with_original_language': 'hi', 'sort_by': 'popularity.desc'},
+                                  'movie', bollywood_tag, None, 'bollywood', 100))
         
-        # 4.1 Fetch popular web series first
-        page = 1
-        while web_series_fetched < WEB_SERIES_COUNT:
-            url = f"{TMDB_BASE_URL}/tv/popular?api_key={self.api_key}&page={page}"
-            try:
-                response = requests.get(url)
-                if response.status_code == 200:
-                    data = response.json()
-                    results = data.get('results', [])
-                    if not results:
-                        break
-                    
-                    # Process TV shows similar to movies
-                    before_count = len(self.unique_movie_ids)
-                    for show in results:
-                        if show.get('id') and show['id'] not in self.unique_movie_ids:
-                            try:
-                                show_details = self._get_tv_details(show['id'])
-                                if show_details:
-                                    # Add 'web series' tag for easier searching
-                                    show_details['document'] += " web series tv show"
-                                    self.movies.append(show_details)
-                                    self.unique_movie_ids.add(show['id'])
-                                    time.sleep(0.1)  # Prevent rate limiting
-                            except Exception as e:
-                                print(f"Error processing TV show {show.get('id')}: {e}")
-                    
-                    after_count = len(self.unique_movie_ids)
-                    web_series_fetched += (after_count - before_count)
-                    
-                    self._save_progress(f"Popular web series (page {page})")
-                    page += 1
-                    time.sleep(0.5)
-                    
-                    if page > data.get('total_pages', 1) or page > 15:  # Limit to 15 pages
-                        break
-                else:
-                    print(f"Error {response.status_code} when fetching popular web series")
-                    time.sleep(2)
-            except Exception as e:
-                print(f"Exception while fetching popular web series: {e}")
-                time.sleep(2)
+        # By popular Bollywood studios/production companies
+        bollywood_studios = [
+            1569,   # Yash Raj Films
+            2515,   # Dharma Productions
+            1913,   # Excel Entertainment
+            5626,   # Red Chillies Entertainment
+            1884,   # UTV Motion Pictures
+            3538,   # T-Series
+            7294,   # Viacom18 Studios
+            128250, # Aamir Khan Productions
+            156782  # Sanjay Leela Bhansali Productions
+        ]
+        for studio_id in bollywood_studios:
+            queries.append(CrawlQuery(f"studio-{studio_id}-hi", "discover/movie",
+                                      {'with_companies': studio_id, 'with_original_language': 'hi',
+                                       'sort_by': 'popularity.desc'},
+                                      'movie', bollywood_tag, None, 'bollywood', 10))
         
-        # Final save
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.movies, f, ensure_ascii=False, indent=2)
-            
-        elapsed_time = (time.time() - start_time) / 60
+        # South Indian movies (Tamil, Telugu, Malayalam, Kannada)
+        for language_code, language_name in SOUTH_INDIAN_LANGUAGES.items():
+            # Language and category tags, as added by the original per-language crawl
+            tag = f" {language_name.lower()} south indian" * 2
+            queries.append(CrawlQuery(f"language-{language_code}", "discover/movie",
+                                      {'with_original_language': language_code, 'sort_by': 'popularity.desc'},
+                                      'movie', tag, None, 'south_indian', 20))
         
-        # Print summary
-        print("\n=== FINAL SUMMARY ===")
-        print(f"Total movies/shows in dataset: {len(self.movies)}")
-        print(f"- Hollywood/International: {hollywood_count}")
-        print(f"- Bollywood: {bollywood_fetched}")
-        print(f"- South Indian: {south_indian_fetched}")
-        print(f"- Web Series: {web_series_fetched}")
-        print(f"Fetched and saved in {elapsed_time:.2f} minutes")
+        # Web series (TV shows), from enough listings to fill WEB_SERIES_COUNT despite overlaps
+        tv_tag = " web series tv show"
+        queries.append(CrawlQuery("tv-popular", "tv/popular", {}, 'tv', tv_tag, None, 'web_series', 25))
+        queries.append(CrawlQuery("tv-top-rated", "tv/top_rated", {}, 'tv', tv_tag, None, 'web_series', 25))
+        for language_code in ['hi', *SOUTH_INDIAN_LANGUAGES]:
+            queries.append(CrawlQuery(f"tv-language-{language_code}", "discover/tv",
+                                      {'with_original_language': language_code, 'sort_by': 'popularity.desc'},
+                                      'tv', tv_tag, None, 'web_series', 5))
+        for year in range(current_year, current_year - 10, -1):
+            queries.append(CrawlQuery(f"tv-year-{year}", "discover/tv",
+                                      {'first_air_date_year': year, 'sort_by': 'popularity.desc'},
+                                      'tv', tv_tag, None, 'web_series', 3))
+        return queries
+    
+    def _discover_stage(self, job):
+        """Fetch one listing page and pass on its results"""
+        params = '&'.join(f"{key}={value}" for key, value in job.params.items())
+        url = f"{TMDB_BASE_URL}/{job.path}?api_key={self.api_key}&{params}"
+        data = None
+        try:
+            response = requests.get(url)
+            if response.status_code == 200:
+                data = response.json()
+            else:
+                print(f"Error {response.status_code} when fetching {job.series} page {job.page}")
+        except Exception as e:
+            print(f"Exception while fetching {job.series} page {job.page}: {e}")
+        finally:
+            self._planner.record_page(job.series, data)
+        
+        if data is None:
+            # Not completed, so the checkpoint leaves this page for a resumed crawl to retry
+            with self._completed_lock:
+                self._failed_jobs.add(job.key)
+            time.sleep(2)
+            return []
+        
+        results = data.get('results', [])
+        if job.year is not None:
+            # Additional verification for strict year matching
+            results = [movie for movie in results if (movie.get('release_date') or '').startswith(str(job.year))]
+        
+        print(f"Fetched {job.series} page {job.page}")
+        time.sleep(0.5)  # Prevent rate limiting
+        return [(job, result) for result in results if result.get('id')]
+    
+    def _dedupe_stage(self, item):
+        """Drop results already known, already queued, or in a category that is full"""
+        job, result = item
+        key = self._catalog_key(job.content_type, result['id'])
+        is_new = key not in self._queued_ids and not self._is_known(job.content_type, result['id'])
+        category = CrawlPlanner.category_of(result, job.content_type)
+        if not self._planner.admit(job.series, category, is_new):
+            return []
+        self._queued_ids.add(key)
+        return [(job, result, category)]
+    
+    def _detail_stage(self, item):
+        """Fetch full details (credits, keywords) for one new title"""
+        job, result, category = item
+        if job.content_type == 'tv':
+            details = self._get_tv_details(result['id'])
+        else:
+            details = self._get_movie_details(result['id'])
+        time.sleep(0.1)  # Prevent rate limiting
+        if not details:
+            self._planner.release(category)
+            return []
+        return [(job, details, category)]
+    
+    def _document_stage(self, item):
+        """Add the tags of the listing a title was discovered through to its document"""
+        job, details, category = item
+        details['document'] += job.tag
+        return [(details, category)]
+    
+    def _persist_stage(self, item):
+        """Add a finished record to the catalog and checkpoint periodically"""
+        details, category = item
+        try:
+            if not self._add_to_catalog(details):
+                return []
+            self._category_counts[self._content_category(details)] += 1
+        finally:
+            self._planner.release(category)
+        
+        self._persisted_since_checkpoint += 1
+        if self._persisted_since_checkpoint >= CHECKPOINT_EVERY:
+            self._save_checkpoint()
+            self._persisted_since_checkpoint = 0
+        return []
+    
+    def _complete_job(self, job_key):
+        with self._completed_lock:
+            if job_key not in self._failed_jobs:
+                self._completed_jobs.add(job_key)
+    
+    def _save_checkpoint(self):
+        """Save the catalog and the discover pages whose titles are all in it"""
+        # Snapshot first: every job completed by now has all its titles in self.movies
+        with self._completed_lock:
+            completed_jobs = sorted(self._completed_jobs)
+        
+        self._save_catalog()
+        with open(CHECKPOINT_FILE + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'completed_jobs': completed_jobs}, f)
+        os.replace(CHECKPOINT_FILE + '.tmp', CHECKPOINT_FILE)
+        print(f"Checkpoint: {len(self.movies)} movies, {len(completed_jobs)} discover pages done")
+    
+    def _load_checkpoint(self):
+        try:
+            with open(CHECKPOINT_FILE, 'r', encoding='utf-8') as f:
+                return set(json.load(f).get('completed_jobs', []))
+        except (OSError, ValueError) as e:
+            print(f"Could not read {CHECKPOINT_FILE} ({e}), starting the crawl from the beginning")
+            return set()
     
     def _fetch_additional_data(self):
         """Fetch additional movies to reach the target count"""
@@ -355,23 +1314,11 @@ class MovieRecommender:
         needed = TARGET_MOVIE_COUNT - current_count
         
         # Count movies by category in current dataset
-        hollywood_count = 0
-        bollywood_count = 0
-        south_indian_count = 0
-        web_series_count = 0
-        
-        for movie in self.movies:
-            content_type = movie.get('content_type', 'movie')
-            language = movie.get('language', 'unknown')
-            
-            if content_type == 'tv':
-                web_series_count += 1
-            elif language == 'hi':
-                bollywood_count += 1
-            elif language in ['ta', 'te', 'ml', 'kn']:
-                south_indian_count += 1
-            else:
-                hollywood_count += 1
+        counts = Counter(self._content_category(movie) for movie in self.movies)
+        hollywood_count = counts['hollywood']
+        bollywood_count = counts['bollywood']
+        south_indian_count = counts['south_indian']
+        web_series_count = counts['web_series']
         
         print(f"\nCurrent counts:")
         print(f"- Hollywood/International: {hollywood_count}")
@@ -416,13 +1363,12 @@ class MovieRecommender:
                     if response.status_code == 200:
                         data = response.json()
                         for show in data.get('results', []):
-                            if show.get('id') and show['id'] not in self.unique_movie_ids:
+                            if show.get('id') and not self._is_known('tv', show['id']):
                                 try:
                                     show_details = self._get_tv_details(show['id'])
                                     if show_details:
                                         show_details['document'] += " web series tv show"
-                                        self.movies.append(show_details)
-                                        self.unique_movie_ids.add(show['id'])
+                                        self._add_to_catalog(show_details)
                                         time.sleep(0.1)
                                 except Exception as e:
                                     print(f"Error processing TV show {show.get('id')}: {e}")
@@ -441,8 +1387,8 @@ class MovieRecommender:
                 self._fetch_by_year(year, max_pages=2, strict_year=True)
         
         # Save final dataset
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.movies, f, ensure_ascii=False, indent=2)
+        self._save_catalog()
+        self._save_duplicate_report()
             
         print(f"Dataset updated to {len(self.movies)} movies/shows")
     
@@ -462,24 +1408,6 @@ class MovieRecommender:
             print(f"Exception while fetching genres: {e}")
             return []
     
-    def _fetch_from_endpoint(self, endpoint, pages=10):
-        """Fetch movies from a specific TMDB endpoint"""
-        for page in range(1, pages + 1):
-            url = f"{TMDB_BASE_URL}/{endpoint}?api_key={self.api_key}&page={page}"
-            try:
-                response = requests.get(url)
-                if response.status_code == 200:
-                    data = response.json()
-                    self._process_movie_results(data.get('results', []))
-                    print(f"Fetched {endpoint} page {page}/{pages}")
-                    time.sleep(0.5)  # Prevent rate limiting
-                else:
-                    print(f"Error {response.status_code} when fetching {endpoint} page {page}")
-                    time.sleep(2)
-            except Exception as e:
-                print(f"Exception while fetching {endpoint} page {page}: {e}")
-                time.sleep(2)
-    
     def _fetch_by_year(self, year, max_pages=5, strict_year=False):
         """Fetch movies released in a specific year"""
         for page in range(1, max_pages + 1):
@@ -514,30 +1442,6 @@ class MovieRecommender:
                 print(f"Exception while fetching year {year} page {page}: {e}")
                 time.sleep(2)
     
-    def _fetch_by_genre(self, genre_id, genre_name, max_pages=5):
-        """Fetch movies by genre"""
-        for page in range(1, max_pages + 1):
-            url = f"{TMDB_BASE_URL}/discover/movie?api_key={self.api_key}&with_genres={genre_id}&page={page}&sort_by=popularity.desc"
-            try:
-                response = requests.get(url)
-                if response.status_code == 200:
-                    data = response.json()
-                    results = data.get('results', [])
-                    
-                    # Add genre tag for easier searching
-                    for movie in results:
-                        movie['genre_tag'] = genre_name.lower()
-                        
-                    self._process_movie_results(results)
-                    print(f"Fetched genre {genre_name} page {page}/{max_pages}")
-                    time.sleep(0.5)
-                else:
-                    print(f"Error {response.status_code} when fetching genre {genre_name} page {page}")
-                    time.sleep(2)
-            except Exception as e:
-                print(f"Exception while fetching genre {genre_name} page {page}: {e}")
-                time.sleep(2)
-    
     def _fetch_by_language(self, language_code, max_pages=10):
         """Fetch movies by original language"""
         for page in range(1, max_pages + 1):
@@ -556,30 +1460,12 @@ class MovieRecommender:
                 print(f"Exception while fetching language {language_code} page {page}: {e}")
                 time.sleep(2)
     
-    def _fetch_by_company(self, company_id, max_pages=5):
-        """Fetch movies by production company"""
-        for page in range(1, max_pages + 1):
-            url = f"{TMDB_BASE_URL}/discover/movie?api_key={self.api_key}&with_companies={company_id}&page={page}&sort_by=popularity.desc"
-            try:
-                response = requests.get(url)
-                if response.status_code == 200:
-                    data = response.json()
-                    self._process_movie_results(data.get('results', []))
-                    print(f"Fetched company {company_id} page {page}/{max_pages}")
-                    time.sleep(0.5)
-                else:
-                    print(f"Error {response.status_code} when fetching company {company_id} page {page}")
-                    time.sleep(2)
-            except Exception as e:
-                print(f"Exception while fetching company {company_id} page {page}: {e}")
-                time.sleep(2)
-    
     def _process_movie_results(self, results, is_bollywood=False, is_south_indian=False, language=None):
         """Process movie results and add to dataset if not already present"""
         count = 0
         for movie in results:
             movie_id = movie.get('id')
-            if movie_id and movie_id not in self.unique_movie_ids:
+            if movie_id and not self._is_known('movie', movie_id):
                 try:
                     # Get additional movie details
                     movie_details = self._get_movie_details(movie_id)
@@ -597,13 +1483,53 @@ class MovieRecommender:
                         if 'language_tag' in movie:
                             movie_details['document'] += f" {movie['language_tag']}"
                         
-                        self.movies.append(movie_details)
-                        self.unique_movie_ids.add(movie_id)
-                        count += 1
+                        if self._add_to_catalog(movie_details):
+                            count += 1
                 except Exception as e:
                     print(f"Error processing movie {movie_id}: {e}")
         
-        print(f"Added {count} new movies from batch")
+        print(f"Added {count} new movies from batch")
+    
+    @staticmethod
+    def _catalog_key(content_type, item_id):
+        """Namespaced catalog key, so movie and TV IDs never collide"""
+        return (content_type, item_id)
+    
+    def _is_known(self, content_type, item_id):
+        """True if an ID is already in the catalog or was rejected as a duplicate"""
+        key = self._catalog_key(content_type, item_id)
+        return key in self.unique_movie_ids or key in self.duplicate_ids
+    
+    def _add_to_catalog(self, details):
+        """Append a detail record unless it near-duplicates an existing entry
+        
+        Returns True when the record was added. Rejected records are listed in
+        the duplicate report.
+        """
+        if self._near_duplicates is None:
+            self._near_duplicates = NearDuplicateIndex()
+            for movie in self.movies:
+                self._near_duplicates.add(self._catalog_key(movie.get('content_type', 'movie'), movie['id']), movie)
+        
+        key = self._catalog_key(details['content_type'], details['id'])
+        match = self._near_duplicates.find(details)
+        if match is not None:
+            original_key, similarity = match
+            self.duplicate_ids.add(key)
+            self.duplicate_report.append(NearDuplicateIndex.report_entry(key, details, match))
+            print(f"Skipping {key[0]} {key[1]} ({details.get('title', '')}): near-duplicate of "
+                  f"{original_key[0]} {original_key[1]} (similarity {similarity:.2f})")
+            return False
+        
+        self.movies.append(details)
+        self.unique_movie_ids.add(key)
+        self._near_duplicates.add(key, details)
+        return True
+    
+    def _save_duplicate_report(self):
+        """Write every near-duplicate rejected for this catalog, this run's included"""
+        save_duplicate_report(self.duplicate_report)
+        print(f"{len(self.duplicate_report)} near-duplicates rejected so far, see {DUPLICATE_REPORT_FILE}")
     
     def _get_movie_details(self, movie_id, prefer_hindi=False):
         """Get detailed information about a specific movie"""
@@ -611,85 +1537,7 @@ class MovieRecommender:
         try:
             response = requests.get(url)
             if response.status_code == 200:
-                data = response.json()
-                
-                # Basic movie information
-                title = data.get('title', '')
-                original_title = data.get('original_title', '')
-                overview = data.get('overview', '')
-                release_date = data.get('release_date', '')
-                
-                # Language handling - for Bollywood preferences
-                original_language = data.get('original_language', '')
-                if prefer_hindi and original_language != 'hi':
-                    return None
-                
-                # Get genres, cast, crew
-                genres = [genre['name'] for genre in data.get('genres', [])]
-                
-                # Get director and top cast
-                director = ""
-                cast = []
-                
-                credits = data.get('credits', {})
-                crew = credits.get('crew', [])
-                actors = credits.get('cast', [])
-                
-                for person in crew:
-                    if person.get('job') == 'Director':
-                        director = person.get('name', '')
-                        break
-                
-                for actor in actors[:10]:  # Get top 10 cast
-                    if actor.get('name'):
-                        cast.append(actor.get('name'))
-                
-                # Get keywords/tags
-                keywords = []
-                if 'keywords' in data and 'keywords' in data['keywords']:
-                    keywords = [kw['name'] for kw in data['keywords']['keywords']]
-                
-                # Create a comprehensive document for text search
-                document = f"{title} {original_title} {overview} "
-                document += f"{' '.join(genres)} {director} {' '.join(cast)} {' '.join(keywords)} "
-                document += f"{release_date[:4] if release_date else ''} "  # Add year for searching by year
-                
-                # Add movie or specific category identifiers
-                document += "movie film "
-                
-               # Add language specific identifiers
-                if original_language == 'en':
-                    document += "english "
-                elif original_language == 'hi':
-                    document += "hindi bollywood "
-                elif original_language == 'ta':
-                    document += "tamil kollywood "
-                elif original_language == 'te':
-                    document += "telugu tollywood "
-                elif original_language == 'ml':
-                    document += "malayalam mollywood "
-                elif original_language == 'kn':
-                    document += "kannada sandalwood "
-                
-                # Return structured movie data
-                return {
-                    'id': movie_id,
-                    'title': title,
-                    'original_title': original_title,
-                    'overview': overview,
-                    'release_date': release_date,
-                    'genres': genres,
-                    'director': director,
-                    'cast': cast,
-                    'keywords': keywords,
-                    'language': original_language,
-                    'document': document,
-                    'content_type': 'movie',
-                    'poster_path': data.get('poster_path', ''),
-                    'backdrop_path': data.get('backdrop_path', ''),
-                    'popularity': data.get('popularity', 0),
-                    'vote_average': data.get('vote_average', 0)
-                }
+                return self._build_movie_record(response.json(), movie_id, prefer_hindi=prefer_hindi)
             else:
                 print(f"Error {response.status_code} when fetching movie details for ID {movie_id}")
                 return None
@@ -697,79 +1545,98 @@ class MovieRecommender:
             print(f"Exception while fetching movie details for ID {movie_id}: {e}")
             return None
     
+    @staticmethod
+    def _build_movie_record(data, movie_id=None, prefer_hindi=False):
+        """Turn a TMDB movie details payload (with credits and keywords) into a catalog record"""
+        if movie_id is None:
+            movie_id = data['id']
+        
+        # Basic movie information
+        title = data.get('title', '')
+        original_title = data.get('original_title', '')
+        overview = data.get('overview', '')
+        release_date = data.get('release_date', '')
+        
+        # Language handling - for Bollywood preferences
+        original_language = data.get('original_language', '')
+        if prefer_hindi and original_language != 'hi':
+            return None
+        
+        # Get genres, cast, crew
+        genres = [genre['name'] for genre in data.get('genres', [])]
+        
+        # Get director and top cast
+        director = ""
+        cast = []
+        
+        credits = data.get('credits', {})
+        crew = credits.get('crew', [])
+        actors = credits.get('cast', [])
+        
+        for person in crew:
+            if person.get('job') == 'Director':
+                director = person.get('name', '')
+                break
+        
+        for actor in actors[:10]:  # Get top 10 cast
+            if actor.get('name'):
+                cast.append(actor.get('name'))
+        
+        # Get keywords/tags
+        keywords = []
+        if 'keywords' in data and 'keywords' in data['keywords']:
+            keywords = [kw['name'] for kw in data['keywords']['keywords']]
+        
+        # Create a comprehensive document for text search
+        document = f"{title} {original_title} {overview} "
+        document += f"{' '.join(genres)} {director} {' '.join(cast)} {' '.join(keywords)} "
+        document += f"{release_date[:4] if release_date else ''} "  # Add year for searching by year
+        
+        # Add movie or specific category identifiers
+        document += "movie film "
+        
+       # Add language specific identifiers
+        if original_language == 'en':
+            document += "english "
+        elif original_language == 'hi':
+            document += "hindi bollywood "
+        elif original_language == 'ta':
+            document += "tamil kollywood "
+        elif original_language == 'te':
+            document += "telugu tollywood "
+        elif original_language == 'ml':
+            document += "malayalam mollywood "
+        elif original_language == 'kn':
+            document += "kannada sandalwood "
+        
+        # Return structured movie data
+        return {
+            'id': movie_id,
+            'title': title,
+            'original_title': original_title,
+            'overview': overview,
+            'release_date': release_date,
+            'genres': genres,
+            'director': director,
+            'cast': cast,
+            'keywords': keywords,
+            'language': original_language,
+            'document': document,
+            'content_type': 'movie',
+            'poster_path': data.get('poster_path', ''),
+            'backdrop_path': data.get('backdrop_path', ''),
+            'popularity': data.get('popularity', 0),
+            'vote_average': data.get('vote_average', 0),
+            'vote_count': data.get('vote_count', 0)
+        }
+    
     def _get_tv_details(self, show_id):
         """Get detailed information about a specific TV show"""
         url = f"{TMDB_BASE_URL}/tv/{show_id}?api_key={self.api_key}&append_to_response=credits,keywords"
         try:
             response = requests.get(url)
             if response.status_code == 200:
-                data = response.json()
-                
-                # Basic show information
-                title = data.get('name', '')
-                original_title = data.get('original_name', '')
-                overview = data.get('overview', '')
-                first_air_date = data.get('first_air_date', '')
-                
-                # Get genres, cast, crew
-                genres = [genre['name'] for genre in data.get('genres', [])]
-                
-                # Get creator and top cast
-                creators = []
-                cast = []
-                
-                for person in data.get('created_by', []):
-                    if person.get('name'):
-                        creators.append(person.get('name'))
-                
-                credits = data.get('credits', {})
-                actors = credits.get('cast', [])
-                
-                for actor in actors[:10]:  # Get top 10 cast
-                    if actor.get('name'):
-                        cast.append(actor.get('name'))
-                
-                # Get keywords/tags
-                keywords = []
-                if 'keywords' in data and 'results' in data['keywords']:
-                    keywords = [kw['name'] for kw in data['keywords']['results']]
-                
-                # Create a comprehensive document for text search
-                document = f"{title} {original_title} {overview} "
-                document += f"{' '.join(genres)} {' '.join(creators)} {' '.join(cast)} {' '.join(keywords)} "
-                document += f"{first_air_date[:4] if first_air_date else ''} "  # Add year for searching by year
-                
-                # Add TV show specific identifiers
-                document += "tv television series show web series "
-                
-                # Add language specific identifiers
-                original_language = data.get('original_language', '')
-                if original_language == 'en':
-                    document += "english "
-                elif original_language == 'hi':
-                    document += "hindi "
-                
-                # Return structured TV show data
-                return {
-                    'id': show_id,
-                    'title': title,
-                    'original_title': original_title,
-                    'overview': overview,
-                    'release_date': first_air_date,
-                    'genres': genres,
-                    'creators': creators,
-                    'cast': cast,
-                    'keywords': keywords,
-                    'language': original_language,
-                    'document': document,
-                    'content_type': 'tv',
-                    'poster_path': data.get('poster_path', ''),
-                    'backdrop_path': data.get('backdrop_path', ''),
-                    'popularity': data.get('popularity', 0),
-                    'vote_average': data.get('vote_average', 0),
-                    'number_of_seasons': data.get('number_of_seasons', 0),
-                    'number_of_episodes': data.get('number_of_episodes', 0)
-                }
+                return self._build_tv_record(response.json(), show_id)
             else:
                 print(f"Error {response.status_code} when fetching TV show details for ID {show_id}")
                 return None
@@ -777,32 +1644,418 @@ class MovieRecommender:
             print(f"Exception while fetching TV show details for ID {show_id}: {e}")
             return None
     
-    def _save_progress(self, description):
-        """Save the current progress"""
-        print(f"Progress: {len(self.unique_movie_ids)} movies - {description}")
-        # Save every 100 movies to avoid losing data if process is interrupted
-        if len(self.unique_movie_ids) % 100 == 0:
-            with open(DATA_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.movies, f, ensure_ascii=False, indent=2)
-            print(f"Saved progress at {len(self.unique_movie_ids)} movies")
+    @staticmethod
+    def _build_tv_record(data, show_id=None):
+        """Turn a TMDB TV details payload (with credits and keywords) into a catalog record"""
+        if show_id is None:
+            show_id = data['id']
+        
+        # Basic show information
+        title = data.get('name', '')
+        original_title = data.get('original_name', '')
+        overview = data.get('overview', '')
+        first_air_date = data.get('first_air_date', '')
+        
+        # Get genres, cast, crew
+        genres = [genre['name'] for genre in data.get('genres', [])]
+        
+        # Get creator and top cast
+        creators = []
+        cast = []
+        
+        for person in data.get('created_by', []):
+            if person.get('name'):
+                creators.append(person.get('name'))
+        
+        credits = data.get('credits', {})
+        actors = credits.get('cast', [])
+        
+        for actor in actors[:10]:  # Get top 10 cast
+            if actor.get('name'):
+                cast.append(actor.get('name'))
+        
+        # Get keywords/tags
+        keywords = []
+        if 'keywords' in data and 'results' in data['keywords']:
+            keywords = [kw['name'] for kw in data['keywords']['results']]
+        
+        # Create a comprehensive document for text search
+        document = f"{title} {original_title} {overview} "
+        document += f"{' '.join(genres)} {' '.join(creators)} {' '.join(cast)} {' '.join(keywords)} "
+        document += f"{first_air_date[:4] if first_air_date else ''} "  # Add year for searching by year
+        
+        # Add TV show specific identifiers
+        document += "tv television series show web series "
+        
+        # Add language specific identifiers
+        original_language = data.get('original_language', '')
+        if original_language == 'en':
+            document += "english "
+        elif original_language == 'hi':
+            document += "hindi "
+        
+        # Return structured TV show data
+        return {
+            'id': show_id,
+            'title': title,
+            'original_title': original_title,
+            'overview': overview,
+            'release_date': first_air_date,
+            'genres': genres,
+            'creators': creators,
+            'cast': cast,
+            'keywords': keywords,
+            'language': original_language,
+            'document': document,
+            'content_type': 'tv',
+            'poster_path': data.get('poster_path', ''),
+            'backdrop_path': data.get('backdrop_path', ''),
+            'popularity': data.get('popularity', 0),
+            'vote_average': data.get('vote_average', 0),
+            'vote_count': data.get('vote_count', 0),
+            'number_of_seasons': data.get('number_of_seasons', 0),
+            'number_of_episodes': data.get('number_of_episodes', 0)
+        }
+    
+    def _save_catalog(self):
+        """Write the in-memory catalog to DATA_FILE"""
+        with CatalogWriter(DATA_FILE) as writer:
+            for movie in self.movies:
+                writer.write(movie)
     
     def _prepare_tfidf(self):
         """Prepare TF-IDF matrix for movie similarity"""
         print("Preparing TF-IDF matrix for recommendations...")
         
-        # Extract documents for vectorization
-        documents = [self._preprocess_text(movie['document']) for movie in self.movies]
+        if CHUNKED_BUILD:
+            self._build_tfidf_chunked()
+        else:
+            # Extract documents for vectorization
+            documents = [self._preprocess_text(movie['document']) for movie in self.movies]
+            
+            # Create TF-IDF vectorizer
+            self.vectorizer = TfidfVectorizer(
+                max_features=TFIDF_MAX_FEATURES,
+                stop_words='english',
+                ngram_range=(1, 2)  # Use both unigrams and bigrams
+            )
+            
+            # Create TF-IDF matrix
+            self.tfidf_matrix = self.vectorizer.fit_transform(documents)
+        print(f"TF-IDF matrix shape: {self.tfidf_matrix.shape}")
         
-        # Create TF-IDF vectorizer
-        self.vectorizer = TfidfVectorizer(
-            max_features=5000,
-            stop_words='english',
-            ngram_range=(1, 2)  # Use both unigrams and bigrams
-        )
+        self._build_id_index()
+        self._prepare_features()
+        self._prepare_field_index()
+        self._prepare_spelling()
+        self._prepare_people_graph()
+        self._stamp_catalog_version()
         
-        # Create TF-IDF matrix
-        self.tfidf_matrix = self.vectorizer.fit_transform(documents)
-        print(f"TF-IDF matrix shape: {self.tfidf_matrix.shape}")
+        if self.shards is not None:
+            self.shards.close()
+            self.shards = None
+        if SEARCH_SHARDS > 1 and self.tfidf_matrix.shape[0] > 0:
+            self.shards = ShardedIndex(self.tfidf_matrix, SEARCH_SHARDS)
+    
+    def _iter_chunks(self, size=BUILD_CHUNK_SIZE):
+        """Yield the catalog in consecutive chunks of at most `size` titles
+        
+        The chunked build streams them back from DATA_FILE, so it does not
+        depend on the in-memory records; _save_catalog writes the file in
+        self.movies order, so the rows still line up.
+        """
+        if not CHUNKED_BUILD or not os.path.exists(DATA_FILE):
+            for start in range(0, len(self.movies), size):
+                yield self.movies[start:start + size]
+            return
+        
+        records = iter_catalog(DATA_FILE)
+        while True:
+            chunk = list(itertools.islice(records, size))
+            if not chunk:
+                return
+            yield chunk
+    
+    def _build_tfidf_chunked(self):
+        """Fit and vectorise the catalog in two streaming passes
+        
+        Pass 1 preprocesses one chunk of documents at a time, spools the text
+        to disk and accumulates hashed term statistics. Pass 2 reads the spool
+        back, vectorises each chunk and appends it to the memory-mapped matrix
+        in MODEL_DIR. The text, term counts and matrix rows held at any time
+        are bounded by BUILD_CHUNK_SIZE documents; the catalog records
+        themselves stay in self.movies, where the API serves them from.
+        """
+        os.makedirs(MODEL_DIR, exist_ok=True)
+        spool_path = os.path.join(MODEL_DIR, 'documents.txt.gz')
+        self.vectorizer = HashedTfidfVectorizer()
+        
+        with gzip.open(spool_path, 'wt', encoding='utf-8') as spool:
+            for number, movies in enumerate(self._iter_chunks(), 1):
+                # Preprocessed text is whitespace-joined tokens, so one line per document
+                documents = [self._preprocess_text(movie['document']) for movie in movies]
+                self.vectorizer.partial_fit(documents)
+                spool.writelines(f"{document}\n" for document in documents)
+                print(f"Counted terms for chunk {number} ({self.vectorizer.n_documents} titles)")
+        self.vectorizer.finalize()
+        
+        def vectorised_chunks():
+            with gzip.open(spool_path, 'rt', encoding='utf-8') as spool:
+                while True:
+                    documents = [line.rstrip('\n') for line in itertools.islice(spool, BUILD_CHUNK_SIZE)]
+                    if not documents:
+                        return
+                    self.vectorizer.record_terms(documents)
+                    yield self.vectorizer.transform(documents)
+        
+        self.tfidf_matrix = write_chunked_csr(os.path.join(MODEL_DIR, 'tfidf'), vectorised_chunks(),
+                                              len(self.vectorizer.buckets))
+        os.remove(spool_path)
+    
+    @staticmethod
+    def _field_texts(movie):
+        """Split a record into the text of each SEARCH_FIELDS entry"""
+        people = [movie.get('director') or ''] + list(movie.get('creators', [])) + list(movie.get('cast', []))
+        content_words = "tv television series show" if movie.get('content_type') == 'tv' else "movie film"
+        return {
+            'title': f"{movie.get('title', '')} {movie.get('original_title', '')}",
+            'overview': movie.get('overview') or '',
+            'genres': ' '.join(movie.get('genres', [])),
+            'people': ' '.join(people),
+            'keywords': ' '.join(movie.get('keywords', [])),
+            'tags': f"{(movie.get('release_date') or '')[:4]} {content_words} {movie.get('language', '')}"
+                    f"{MovieRecommender._category_tag(movie)}",
+        }
+    
+    def _prepare_field_index(self):
+        """Index each field as its own block with the already fitted vectorizer
+        
+        Blocks share the document model's vocabulary and IDF, are each
+        L2-normalised per row, and sit side by side in one matrix. Scaling
+        the query's copy for each block by that field's weight then scores
+        all fields in a single sparse product.
+        """
+        if not FIELD_INDEX_ENABLED:
+            self.field_matrix = None
+            return
+        
+        def field_chunks():
+            for movies in self._iter_chunks():
+                fields = [self._field_texts(movie) for movie in movies]
+                yield sparse.hstack([self.vectorizer.transform([self._preprocess_text(texts[name]) for texts in fields])
+                                     for name in SEARCH_FIELDS], format='csr')
+        
+        num_columns = self.tfidf_matrix.shape[1] * len(SEARCH_FIELDS)
+        if CHUNKED_BUILD:
+            self.field_matrix = write_chunked_csr(os.path.join(MODEL_DIR, 'fields'), field_chunks(), num_columns)
+        else:
+            self.field_matrix = sparse.vstack(list(field_chunks()), format='csr')
+        print(f"Field index shape: {self.field_matrix.shape} ({len(SEARCH_FIELDS)} fields)")
+    
+    def _prepare_spelling(self):
+        """Build the query spelling dictionary
+        
+        Suggestions come from the model's unigram vocabulary and the words of
+        titles and people's names, weighted by how many titles use them.
+        Other words of the catalog text are accepted as correctly spelled so
+        inflections the lemmatiser folds away are left alone.
+        """
+        if not SPELL_CORRECTION_ENABLED:
+            self.spell = None
+            return
+        
+        def words(text):
+            return re.findall(r'\w+', (text or '').lower())
+        
+        counts = Counter()
+        spell = SpellCorrector()
+        for movie in self.movies:
+            names = [movie.get('title'), movie.get('original_title'), movie.get('director')]
+            names += list(movie.get('cast', [])) + list(movie.get('creators', []))
+            counts.update({word for name in names for word in words(name)})
+            for word in words(movie.get('document')):
+                spell.add_known(word)
+        
+        vocabulary = [term for term in self.vectorizer.vocabulary_ if ' ' not in term]
+        document_counts = np.bincount(self.tfidf_matrix.indices, minlength=self.tfidf_matrix.shape[1])
+        for term in vocabulary:
+            counts[term] += int(document_counts[self.vectorizer.vocabulary_[term]])
+        
+        for word, count in counts.items():
+            if len(word) >= SPELL_MIN_WORD_LENGTH and word.isalpha():
+                spell.add(word, count)
+        self.spell = spell
+        print(f"Spelling dictionary: {len(spell.words)} words")
+    
+    @staticmethod
+    def _person_key(name):
+        """Normalise a person's name into the ID used by the people graph"""
+        name = unicodedata.normalize('NFKD', name or '')
+        name = ''.join(char for char in name if not unicodedata.combining(char))
+        return ' '.join(re.sub(r'[^\w\s]', ' ', name.lower()).split())
+    
+    def _prepare_people_graph(self):
+        """Build the title x person incidence matrix and each title's nearest co-credited titles
+        
+        Edges are weighted by billing (1/sqrt(position) for cast, CREW_WEIGHT
+        for directors and creators) and by the person's inverse title count,
+        so sharing a lead actor outweighs sharing a prolific supporting one.
+        Rows are L2-normalised, so a sparse product gives cosine similarity.
+        The incidence is built a chunk of titles at a time; with CHUNKED_BUILD
+        the neighbour lists are written to memory-mapped files in MODEL_DIR.
+        """
+        self.person_ids = {}
+        blocks = [self._credit_rows(movies) for movies in self._iter_chunks()]
+        shape = (len(self.movies), len(self.person_ids))
+        for block in blocks:
+            block.resize((block.shape[0], shape[1]))  # People first credited in later chunks
+        matrix = sparse.vstack(blocks, format='csr') if blocks else sparse.csr_matrix(shape)
+        title_counts = np.bincount(matrix.indices, minlength=shape[1])
+        idf = np.log((1 + shape[0]) / (1 + title_counts)) + 1
+        self.people_matrix = normalize(sparse.csr_matrix(matrix.multiply(idf)))
+        
+        # Precompute neighbours a block of titles at a time to bound the product's size
+        if CHUNKED_BUILD and shape[0]:
+            path = os.path.join(MODEL_DIR, 'people')
+            os.makedirs(path, exist_ok=True)
+            neighbours = np.lib.format.open_memmap(os.path.join(path, 'neighbours.npy'), mode='w+',
+                                                   dtype=np.int32, shape=(shape[0], PEOPLE_NEIGHBOURS))
+            scores = np.lib.format.open_memmap(os.path.join(path, 'scores.npy'), mode='w+',
+                                               dtype=np.float32, shape=(shape[0], PEOPLE_NEIGHBOURS))
+            neighbours[:] = -1
+            scores[:] = 0
+        else:
+            neighbours = np.full((shape[0], PEOPLE_NEIGHBOURS), -1, dtype=np.int32)
+            scores = np.zeros((shape[0], PEOPLE_NEIGHBOURS), dtype=np.float32)
+        transposed = self.people_matrix.T.tocsr()
+        for start in range(0, shape[0], PEOPLE_BUILD_CHUNK):
+            block = (self.people_matrix[start:start + PEOPLE_BUILD_CHUNK] @ transposed).tocsr()
+            for offset in range(block.shape[0]):
+                row_start, row_stop = block.indptr[offset], block.indptr[offset + 1]
+                candidates, similarities = block.indices[row_start:row_stop], block.data[row_start:row_stop]
+                keep = candidates != start + offset
+                candidates, similarities = candidates[keep], similarities[keep]
+                order = np.argsort(-similarities, kind='stable')[:PEOPLE_NEIGHBOURS]
+                neighbours[start + offset, :len(order)] = candidates[order]
+                scores[start + offset, :len(order)] = similarities[order]
+        if isinstance(neighbours, np.memmap):
+            neighbours.flush()
+            scores.flush()
+            neighbours = np.load(neighbours.filename, mmap_mode='r')
+            scores = np.load(scores.filename, mmap_mode='r')
+        self.people_neighbours = (neighbours, scores)
+        print(f"People graph: {shape[1]} people, {self.people_matrix.nnz} credits")
+    
+    def _credit_rows(self, movies):
+        """Incidence rows of `movies` with billing weights, adding new people to person_ids"""
+        rows, columns, weights = [], [], []
+        for row, movie in enumerate(movies):
+            credits = [(name, CREW_WEIGHT) for name in [movie.get('director')] + list(movie.get('creators', []))]
+            credits += [(name, 1 / np.sqrt(position)) for position, name in enumerate(movie.get('cast', []), 1)]
+            for name, weight in credits:
+                key = self._person_key(name)
+                if key:
+                    rows.append(row)
+                    columns.append(self.person_ids.setdefault(key, len(self.person_ids)))
+                    weights.append(weight)
+        # Repeated credits are summed
+        return sparse.csr_matrix((weights, (rows, columns)), shape=(len(movies), len(self.person_ids)))
+    
+    def _people_candidates(self, movie_index, top_n, exclude=None):
+        """Return (rows, cosine scores) of the titles sharing the most people with a title
+        
+        Always served from the precomputed neighbour lists, so at most
+        PEOPLE_NEIGHBOURS rows are returned, however large `top_n` (or a
+        blend or MMR pool) is.
+        """
+        neighbours, scores = self.people_neighbours
+        rows, similarities = neighbours[movie_index], scores[movie_index]
+        if exclude is not None:
+            keep = ~np.isin(rows, exclude)
+            rows, similarities = rows[keep], similarities[keep]
+        keep = (rows >= 0) & (similarities > 0)
+        return rows[keep][:top_n].astype(int), similarities[keep][:top_n].astype(float)
+    
+    def _mixed_candidates(self, movie_index, top_n, exclude=None):
+        """Return (rows, scores) ranked by text and people similarity combined"""
+        text = (self.tfidf_matrix @ self.tfidf_matrix[movie_index].T).toarray().ravel()
+        people = (self.people_matrix @ self.people_matrix[movie_index].T).toarray().ravel()
+        combined = (1 - PEOPLE_MIX_WEIGHT) * text + PEOPLE_MIX_WEIGHT * people
+        rows = self._top_k(combined, top_n, exclude=exclude)
+        return rows, combined[rows]
+    
+    def correct_query(self, query):
+        """Return the spelling-corrected query, or None if nothing was changed"""
+        if self.spell is None:
+            return None
+        corrected = self.spell.correct(query)
+        return corrected if corrected != query else None
+    
+    def _field_query(self, query_vector, field_weights):
+        """Repeat the query once per field block, scaled by the normalised field weights"""
+        query_vector = sparse.csr_matrix(query_vector)
+        vocabulary_size = query_vector.shape[1]
+        total = sum(field_weights.values())
+        
+        indices, data = [], []
+        for block, name in enumerate(SEARCH_FIELDS):
+            weight = field_weights.get(name, 0.0) / total
+            if weight:
+                indices.append(query_vector.indices + block * vocabulary_size)
+                data.append(query_vector.data * weight)
+        indices = np.concatenate(indices) if indices else np.array([], dtype=np.int32)
+        data = np.concatenate(data) if data else np.array([])
+        return sparse.csr_matrix((data, indices, [0, len(indices)]),
+                                 shape=(1, vocabulary_size * len(SEARCH_FIELDS)))
+    
+    def _stamp_catalog_version(self):
+        """Fingerprint the catalog contents and model settings
+        
+        Every record field is included, so refreshed ratings or popularity
+        change the version (and with it HTTP ETags) even if no title was
+        added or removed.
+        """
+        fingerprint = hashlib.sha1()
+        fingerprint.update(json.dumps(self.vectorizer.get_params(), sort_keys=True, default=str).encode('utf-8'))
+        for movie in self.movies:
+            fingerprint.update(json.dumps(movie, sort_keys=True).encode('utf-8'))
+        self.catalog_version = fingerprint.hexdigest()[:16]
+        self.catalog_built_at = time.time()
+    
+    def _build_id_index(self):
+        """Map (content_type, ID) catalog keys to matrix rows (first occurrence wins)"""
+        self.id_to_index = {}
+        for i, movie in enumerate(self.movies):
+            self.id_to_index.setdefault(self._catalog_key(movie.get('content_type', 'movie'), movie['id']), i)
+    
+    def _prepare_features(self):
+        """Precompute the per-title arrays used by hybrid scoring"""
+        popularity = np.array([movie.get('popularity') or 0 for movie in self.movies], dtype=float)
+        ratings = np.array([movie.get('vote_average') or 0 for movie in self.movies], dtype=float)
+        # Older records have no vote_count; treat them as having the prior's weight
+        votes = np.array([movie.get('vote_count', BAYES_MIN_VOTES) or 0 for movie in self.movies], dtype=float)
+        
+        # Normalised log-popularity
+        log_popularity = np.log1p(np.clip(popularity, 0, None))
+        peak = log_popularity.max() if len(log_popularity) else 0
+        self.features['popularity'] = log_popularity / peak if peak > 0 else log_popularity
+        
+        # Bayesian average rating, shrunk towards the catalog mean
+        rated = ratings > 0
+        mean_rating = ratings[rated].mean() if rated.any() else 0.0
+        bayesian = (votes * ratings + BAYES_MIN_VOTES * mean_rating) / (votes + BAYES_MIN_VOTES)
+        self.features['rating'] = bayesian / 10.0
+        
+        # Recency from release_date, halving every RECENCY_HALF_LIFE_YEARS
+        current_year = datetime.now().year
+        years = np.array([self._release_year(movie) for movie in self.movies], dtype=float)
+        recency = np.power(0.5, np.clip(current_year - years, 0, None) / RECENCY_HALF_LIFE_YEARS)
+        self.features['recency'] = np.where(np.isnan(years), 0.0, recency)
+    
+    @staticmethod
+    def _release_year(movie):
+        release_date = movie.get('release_date') or ''
+        return float(release_date[:4]) if release_date[:4].isdigit() else np.nan
     
     def _preprocess_text(self, text):
         """Preprocess text for TF-IDF"""
@@ -828,58 +2081,202 @@ class MovieRecommender:
         
         return ' '.join(tokens)
     
-    def search(self, query, top_n=10):
+    def search(self, query, top_n=10, diversify=None, blend=None, fields=None):
         """Search for movies based on text query"""
+        return self.format_ranking(self.rank_search(query, top_n, diversify=diversify, blend=blend, fields=fields))
+    
+    def rank_search(self, query, depth, diversify=None, blend=None, fields=None):
+        """Rank the catalog for a text query, keeping the best `depth` rows
+        
+        With `fields` (field name -> weight) the query is matched against the
+        per-field index instead of the combined document, and the reported
+        similarity is the weighted mean of the per-field cosines. Misspelled
+        words are corrected before the query is vectorised.
+        """
+        query = self.correct_query(query) or query
+        
         # Preprocess query
         processed_query = self._preprocess_text(query)
         
         # Transform query to TF-IDF vector
         query_vector = self.vectorizer.transform([processed_query])
         
-        # Calculate similarity
-        similarities = cosine_similarity(query_vector, self.tfidf_matrix).flatten()
+        # Get the most similar movies
+        return self._select(query_vector, depth, diversify=diversify, blend=blend, fields=fields)
+    
+    def format_ranking(self, ranking, start=0, stop=None):
+        """Copy a slice of ranked records and attach their similarity (and blended score)
+        
+        Copies keep concurrent requests from seeing each other's scores on
+        the shared records.
+        """
+        results = []
+        stop = len(ranking.indices) if stop is None else stop
+        for position in range(start, min(stop, len(ranking.indices))):
+            movie = dict(self.movies[ranking.indices[position]], similarity=float(ranking.similarities[position]))
+            if ranking.scores is not None:
+                movie['score'] = float(ranking.scores[position])
+            results.append(movie)
+        return results
+    
+    def _top_k(self, scores, top_n, exclude=None):
+        """Return indices of the top_n highest scores, best first, skipping `exclude`"""
+        if exclude is not None and len(exclude):
+            scores = scores.copy()
+            scores[exclude] = -np.inf
+        top_n = min(top_n, len(scores))
+        if top_n <= 0:
+            return np.array([], dtype=int)
+        
+        # Partial selection first, then sort only the winners
+        candidates = np.argpartition(-scores, top_n - 1)[:top_n]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return candidates[np.isfinite(scores[candidates])]
+    
+    def _candidates(self, query_vector, top_n, exclude=None, fields=None):
+        """Return (rows, cosine scores) of the top_n rows for an L2-normalised query
+        
+        Scores every row in-process, or scatters the query to the worker
+        shards when SEARCH_SHARDS is set. Field-weighted queries are scored
+        against the field index in-process.
+        """
+        matrix = self.tfidf_matrix
+        if fields is not None and self.field_matrix is not None:
+            matrix, query_vector = self.field_matrix, self._field_query(query_vector, fields)
+        elif self.shards is not None:
+            return self.shards.top_k(query_vector, top_n, exclude=exclude)
+        
+        # Rows are L2-normalised (per field block), so the dot product is the cosine
+        scores = (matrix @ query_vector.T).toarray().ravel()
+        indices = self._top_k(scores, top_n, exclude=exclude)
+        return indices, scores[indices]
+    
+    def _select(self, query_vector, top_n, exclude=None, diversify=None, blend=None, fields=None, source=None):
+        """Rank the catalog against a query vector
+        
+        A blend re-scores the best text candidates with the per-title
+        features, and diversify re-ranks the candidate pool with MMR.
+        `source(pool_size)` may supply the (rows, scores) candidates instead
+        of scoring `query_vector`.
+        """
+        if source is None:
+            def source(pool_size):
+                return self._candidates(query_vector, pool_size, exclude=exclude, fields=fields)
+        
+        if not blend and diversify is None:
+            return Ranking(*source(top_n), None)
+        
+        pool_size = max(top_n, BLEND_POOL_SIZE if blend else 0, MMR_POOL_SIZE if diversify is not None else 0)
+        candidates, similarities = source(pool_size)
+        relevance = self._blend(candidates, similarities, blend) if blend else similarities
+        
+        if diversify is None:
+            order = np.argsort(-relevance, kind='stable')[:top_n]
+        else:
+            order = self._diversify(candidates, relevance, top_n, diversify)
+        return Ranking(candidates[order], similarities[order], relevance[order] if blend else None)
+    
+    def _blend(self, candidates, text_scores, blend):
+        """Weighted sum of text similarity and title features over the candidates"""
+        total = text_scores * blend.get('text', 0.0)
+        for feature, weight in blend.items():
+            if feature != 'text' and weight:
+                total = total + weight * self.features[feature][candidates]
+        return total
+    
+    def _diversify(self, candidates, relevance, top_n, lambda_):
+        """Greedy Maximal Marginal Relevance over a small candidate pool
+        
+        `lambda_` = 1 keeps the pure relevance order, lower values trade
+        relevance for novelty. Pairwise similarities are computed once as a
+        dense block; each greedy step is a single vectorised update. Returns
+        positions into `candidates`.
+        """
+        if len(candidates) == 0:
+            return np.array([], dtype=int)
         
-        # Get indices of top similar movies
-        top_indices = similarities.argsort()[:-top_n-1:-1]
+        vectors = self.tfidf_matrix[candidates]
+        pairwise = (vectors @ vectors.T).toarray()
         
-        # Get top movies
-        top_movies = [self.movies[i] for i in top_indices]
+        # Highest similarity of each candidate to anything already selected
+        max_similarity = np.zeros(len(candidates))
+        available = np.ones(len(candidates), dtype=bool)
+        selected = []
         
-        # Add similarity scores
-        for i, movie in enumerate(top_movies):
-            movie['similarity'] = float(similarities[top_indices[i]])
+        for _ in range(min(top_n, len(candidates))):
+            mmr = lambda_ * relevance - (1 - lambda_) * max_similarity
+            mmr[~available] = -np.inf
+            best = int(np.argmax(mmr))
+            selected.append(best)
+            available[best] = False
+            np.maximum(max_similarity, pairwise[best], out=max_similarity)
         
-        return top_movies
+        return np.array(selected, dtype=int)
     
-    def get_recommendations(self, movie_id, top_n=10):
+    def get_recommendations(self, movie_id, top_n=10, diversify=None, blend=None, mode='text', content_type='movie'):
         """Get movie recommendations based on a specific movie"""
+        ranking = self.rank_recommendations(movie_id, top_n, diversify=diversify, blend=blend, mode=mode,
+                                            content_type=content_type)
+        return self.format_ranking(ranking) if ranking else []
+    
+    def rank_recommendations(self, movie_id, depth, diversify=None, blend=None, mode='text', content_type='movie'):
+        """Rank the catalog by similarity to one title, or None if it is unknown
+        
+        `mode` is one of RECOMMENDATION_MODES: 'text' compares documents,
+        'people' compares cast and crew, and 'mixed' combines the two.
+        """
         # Find the movie in our dataset
-        movie_index = None
-        for i, movie in enumerate(self.movies):
-            if movie['id'] == movie_id:
-                movie_index = i
-                break
+        movie_index = self.id_to_index.get(self._catalog_key(content_type, movie_id))
         
         if movie_index is None:
-            return []
+            return None
+        
+        # Get the most similar movies (excluding the movie itself)
+        source = None
+        if mode == 'people':
+            def source(pool_size):
+                return self._people_candidates(movie_index, pool_size, exclude=[movie_index])
+        elif mode == 'mixed':
+            def source(pool_size):
+                return self._mixed_candidates(movie_index, pool_size, exclude=[movie_index])
         
-        # Calculate similarity with all other movies
         movie_vector = self.tfidf_matrix[movie_index]
-        similarities = cosine_similarity(movie_vector, self.tfidf_matrix).flatten()
+        return self._select(movie_vector, depth, exclude=[movie_index], diversify=diversify, blend=blend,
+                            source=source)
+    
+    def get_profile_recommendations(self, movie_ids, weights=None, top_n=10, diversify=None, blend=None,
+                                    content_types=None):
+        """Get recommendations for a watch history of several movies
+        
+        The seed rows are combined into one profile vector with a single sparse
+        product, the catalog is scored once, and every seed is excluded.
+        Unknown IDs are ignored; duplicate IDs add up their weights.
+        `content_types` gives each ID's namespace and defaults to 'movie'.
+        """
+        if weights is None:
+            weights = [1.0] * len(movie_ids)
+        if content_types is None:
+            content_types = ['movie'] * len(movie_ids)
         
-        # Get indices of top similar movies (excluding the movie itself)
-        indices = list(range(len(similarities)))
-        indices.sort(key=lambda x: similarities[x], reverse=True)
-        indices = [i for i in indices if i != movie_index][:top_n]
+        seed_weights = {}
+        for movie_id, weight, content_type in zip(movie_ids, weights, content_types):
+            index = self.id_to_index.get(self._catalog_key(content_type, movie_id))
+            if index is not None:
+                seed_weights[index] = seed_weights.get(index, 0.0) + float(weight)
+        
+        if not seed_weights:
+            return []
         
-        # Get top similar movies
-        similar_movies = [self.movies[i] for i in indices]
+        # Weighted sum of the seed rows: (1 x seeds) @ (seeds x features)
+        seed_indices = np.fromiter(seed_weights.keys(), dtype=int)
+        weight_row = sparse.csr_matrix(np.fromiter(seed_weights.values(), dtype=float).reshape(1, -1))
+        profile = normalize(weight_row @ self.tfidf_matrix[seed_indices])
+        if profile.nnz == 0:
+            return []  # Seeds without any indexed terms say nothing about taste
         
-        # Add similarity scores
-        for i, movie in enumerate(similar_movies):
-            movie['similarity'] = float(similarities[indices[i]])
+        ranking = self._select(profile, top_n, exclude=seed_indices, diversify=diversify, blend=blend)
         
-        return similar_movies
+        return self.format_ranking(ranking)
     
     def get_random_recommendations(self, top_n=10):
         """Get random movie recommendations"""
@@ -914,58 +2311,606 @@ class MovieRecommender:
         
         return top_rated_movies
     
-    def get_movie_details(self, movie_id):
-        """Get details for a specific movie by ID"""
-        for movie in self.movies:
-            if movie['id'] == movie_id:
-                return movie
+    def get_movie_details(self, movie_id, content_type='movie'):
+        """Get details for a specific movie (or TV show, with content_type='tv') by ID"""
+        index = self.id_to_index.get(self._catalog_key(content_type, movie_id))
+        return self.movies[index] if index is not None else None
+
+
+class RankingCache:
+    """Short-lived LRU cache of ranked candidate lists keyed by query and catalog version
+    
+    Memory is bounded by the total number of cached rows rather than the
+    number of queries, so a few deep rankings cannot crowd out the process.
+    """
+    
+    def __init__(self, max_rows=RANKING_CACHE_MAX_ROWS, ttl=RANKING_CACHE_TTL):
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, ranking)
+        self._rows = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def key(spec, catalog_version):
+        raw = json.dumps(spec, sort_keys=True) + catalog_version
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, ranking = entry
+            if expires_at < time.monotonic():
+                self._evict(key)
+                return None
+            self._entries.move_to_end(key)
+            return ranking
+    
+    def put(self, key, ranking):
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            self._entries[key] = (time.monotonic() + self.ttl, ranking)
+            self._rows += len(ranking.indices)
+            while self._rows > self.max_rows and len(self._entries) > 1:
+                self._evict(next(iter(self._entries)))
+    
+    def _evict(self, key):
+        _, ranking = self._entries.pop(key)
+        self._rows -= len(ranking.indices)
+
+
+class ResponseCache:
+    """LRU cache of encoded response bodies keyed by ETag and content encoding
+    
+    ETags include the catalog version, so entries for an old catalog are
+    never hit again and simply age out. Memory is bounded by total bytes.
+    """
+    
+    def __init__(self, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (etag, accepted encoding) -> (body, content encoding, mimetype)
+        self._bytes = 0
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+    
+    def put(self, key, entry):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key)[0])
+            self._entries[key] = entry
+            self._bytes += len(entry[0])
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted[0])
+
+
+def ingest_dumps(paths, movie_id_exports=(), tv_id_exports=(), min_popularity=0.0, dedupe=True):
+    """Build or extend the catalog offline from TMDB-style export files
+    
+    `paths` are JSON Lines files (optionally gzipped) holding one movie or TV
+    details payload per line, with credits and keywords appended as the API
+    returns them. `movie_id_exports` / `tv_id_exports` are TMDB daily ID
+    exports; when given for a content type, only IDs listed there with at
+    least `min_popularity` (and not marked adult) are ingested. Everything
+    is streamed, and records are written straight to the catalog store, so
+    memory stays bounded by the dedupe state rather than by the size of the
+    dumps.
+    """
+    start_time = time.time()
+    
+    allowed_ids = {}  # content type -> allowed IDs, for types with an export
+    for content_type, exports in (('movie', movie_id_exports), ('tv', tv_id_exports)):
+        for export in exports:
+            allowed = allowed_ids.setdefault(content_type, set())
+            for entry in iter_json_lines(export):
+                if not entry.get('adult') and (entry.get('popularity') or 0) >= min_popularity:
+                    allowed.add(entry.get('id'))
+    
+    seen = set()
+    near_duplicates = NearDuplicateIndex() if dedupe else None
+    duplicate_report = []
+    added = skipped = known_duplicates = 0
+    
+    with CatalogWriter(DATA_FILE) as writer:
+        # Keep what is already in the catalog, and what earlier runs rejected
+        if os.path.exists(DATA_FILE):
+            duplicate_report = load_duplicate_report()
+            seen.update(duplicate_report_key(entry) for entry in duplicate_report)
+            known_duplicates = len(duplicate_report)
+            for movie in iter_catalog(DATA_FILE):
+                key = (movie.get('content_type', 'movie'), movie['id'])
+                seen.add(key)
+                if near_duplicates is not None:
+                    near_duplicates.add(key, movie)
+                writer.write(movie)
+        
+        for path in paths:
+            for data in iter_json_lines(path):
+                is_tv = 'first_air_date' in data or ('name' in data and 'title' not in data)
+                try:
+                    allowed = allowed_ids.get('tv' if is_tv else 'movie')
+                    if allowed is not None and data.get('id') not in allowed:
+                        skipped += 1
+                        continue
+                    record = (MovieRecommender._build_tv_record(data) if is_tv
+                              else MovieRecommender._build_movie_record(data))
+                except (KeyError, TypeError, AttributeError) as e:
+                    print(f"Skipping unusable record {data.get('id')} in {path}: {e}")
+                    skipped += 1
+                    continue
+                
+                key = (record['content_type'], record['id'])
+                if key in seen:
+                    skipped += 1
+                    continue
+                seen.add(key)
+                
+                if near_duplicates is not None:
+                    match = near_duplicates.find(record)
+                    if match is not None:
+                        duplicate_report.append(NearDuplicateIndex.report_entry(key, record, match))
+                        continue
+                    near_duplicates.add(key, record)
+                
+                # Same category tags the live crawl adds
+                record['document'] += MovieRecommender._category_tag(record)
+                writer.write(record)
+                added += 1
+                if added % 100000 == 0:
+                    print(f"Ingested {added} titles...")
+    
+    save_duplicate_report(duplicate_report)
+    
+    elapsed_time = (time.time() - start_time) / 60
+    print(f"Ingested {added} new titles ({skipped} skipped, {len(duplicate_report) - known_duplicates} near-duplicates) "
+          f"into {DATA_FILE} in {elapsed_time:.2f} minutes")
+    return added
+
+
+# Shared recommender and scoring pool, created once per process
+_recommender = None
+_recommender_lock = threading.Lock()
+scoring_pool = ScoringPool() if SCORING_POOL_ENABLED else None
+ranking_cache = RankingCache()
+response_cache = ResponseCache()
+
+
+def get_recommender():
+    """Return the process-wide recommender, building it on first use"""
+    global _recommender
+    if _recommender is None:
+        with _recommender_lock:
+            if _recommender is None:
+                _recommender = MovieRecommender()
+    return _recommender
+
+
+def run_scoring(func, *args, **kwargs):
+    """Run a scoring call on the worker pool, or inline when the pool is disabled"""
+    if scoring_pool is None:
+        return func(*args, **kwargs)
+    return scoring_pool.run(func, *args, **kwargs)
+
+
+def _parse_top_n(default=DEFAULT_RESULTS):
+    """Read the `n` query parameter, clamped to MAX_RESULTS"""
+    raw = request.args.get('n', default)
+    try:
+        top_n = int(raw)
+    except (TypeError, ValueError):
+        raise InvalidParameterError(f"Invalid value for n: {raw!r}")
+    if top_n < 1:
+        raise InvalidParameterError("n must be a positive integer")
+    return min(top_n, MAX_RESULTS)
+
+
+def _parse_diversify(raw):
+    """Validate the optional MMR trade-off parameter (0..1)"""
+    if raw is None or raw == '':
+        return None
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        raise InvalidParameterError(f"Invalid value for diversify: {raw!r}")
+    if not 0.0 <= value <= 1.0:
+        raise InvalidParameterError("diversify must be between 0 and 1")
+    return value
+
+
+def _parse_blend(raw):
+    """Resolve a blend preset name or explicit weights like "text:0.6,rating:0.4"
+    
+    Returns None for pure text scoring, so the cheap path is used.
+    """
+    if raw is None or raw == '':
+        raw = DEFAULT_BLEND
+    if not isinstance(raw, (str, dict)):
+        raise InvalidParameterError(f"Invalid blend: {raw!r}")
+    
+    if isinstance(raw, dict):
+        items = raw.items()
+    elif raw in SCORING_BLENDS:
+        items = SCORING_BLENDS[raw].items()
+    else:
+        items = []
+        for part in str(raw).split(','):
+            feature, _, weight = part.partition(':')
+            items.append((feature.strip(), weight))
+    
+    blend = {}
+    for feature, weight in items:
+        if feature not in BLEND_FEATURES:
+            raise InvalidParameterError(f"Unknown blend {raw!r}; use one of {sorted(SCORING_BLENDS)} "
+                                        f"or weights for {', '.join(BLEND_FEATURES)}")
+        try:
+            blend[feature] = float(weight)
+        except (TypeError, ValueError):
+            raise InvalidParameterError(f"Invalid weight for {feature}: {weight!r}")
+        if not math.isfinite(blend[feature]) or blend[feature] < 0:
+            raise InvalidParameterError("Blend weights must be finite and not negative")
+    
+    if not any(blend.values()):
+        raise InvalidParameterError("At least one blend weight must be positive")
+    if all(feature == 'text' or not weight for feature, weight in blend.items()):
         return None
+    return blend
+
+
+def _parse_content_type(raw):
+    """Validate the ID namespace of a title (movie or tv)"""
+    if raw is None or raw == '':
+        return 'movie'
+    if raw not in CONTENT_TYPES:
+        raise InvalidParameterError(f"Unknown type {raw!r}; use one of {', '.join(CONTENT_TYPES)}")
+    return raw
+
+
+def _parse_mode(raw):
+    """Validate the recommendation mode (text, people or mixed)"""
+    if raw is None or raw == '':
+        return 'text'
+    if raw not in RECOMMENDATION_MODES:
+        raise InvalidParameterError(f"Unknown mode {raw!r}; use one of {', '.join(RECOMMENDATION_MODES)}")
+    return raw
+
+
+def _parse_fields(raw):
+    """Resolve a field-weight preset or explicit weights like "title:2,people:1"
+    
+    Returns None to search the combined document as usual.
+    """
+    if raw is None or raw == '':
+        return None
+    if not isinstance(raw, (str, dict)):
+        raise InvalidParameterError(f"Invalid fields: {raw!r}")
+    
+    if isinstance(raw, dict):
+        items = raw.items()
+    elif raw in FIELD_WEIGHT_PRESETS:
+        items = FIELD_WEIGHT_PRESETS[raw].items()
+    else:
+        items = []
+        for part in str(raw).split(','):
+            name, _, weight = part.partition(':')
+            items.append((name.strip(), weight))
+    
+    fields = {}
+    for name, weight in items:
+        if name not in SEARCH_FIELDS:
+            raise InvalidParameterError(f"Unknown fields {raw!r}; use one of {sorted(FIELD_WEIGHT_PRESETS)} "
+                                        f"or weights for {', '.join(SEARCH_FIELDS)}")
+        try:
+            fields[name] = float(weight)
+        except (TypeError, ValueError):
+            raise InvalidParameterError(f"Invalid weight for {name}: {weight!r}")
+        if not math.isfinite(fields[name]) or fields[name] < 0:
+            raise InvalidParameterError("Field weights must be finite and not negative")
+    
+    if not any(fields.values()):
+        raise InvalidParameterError("At least one field weight must be positive")
+    return fields
+
+
+@app.errorhandler(InvalidParameterError)
+def handle_invalid_parameter(error):
+    return jsonify({'error': str(error)}), 400
+
+
+@app.errorhandler(ServerBusyError)
+def handle_server_busy(error):
+    return jsonify({'error': str(error)}), 429, {'Retry-After': '1'}
+
+
+@app.errorhandler(ScoringTimeoutError)
+def handle_scoring_timeout(error):
+    return jsonify({'error': str(error)}), 503, {'Retry-After': '1'}
 
 
 # Initialize Flask application
+def _response_encoding():
+    """Pick the best content encoding the client accepts"""
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return 'identity'
+
+
+def _encode_body(body, encoding):
+    if len(body) < COMPRESSION_MIN_BYTES or encoding == 'identity':
+        return body, 'identity'
+    if encoding == 'br':
+        return brotli.compress(body, quality=5), 'br'
+    return gzip.compress(body, compresslevel=6), 'gzip'
+
+
+def http_cached(policy):
+    """Serve a deterministic GET endpoint with ETag revalidation and cached compressed bodies
+    
+    The ETag is derived from the catalog version and the request path and
+    query string. A matching If-None-Match (or If-Modified-Since) is
+    answered with 304 once a 200 body for that ETag is cached, so the view
+    runs at most once per encoding. Error responses pass through uncached,
+    without validators and never as 304.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            recommender = get_recommender()
+            digest = hashlib.sha1(f"{recommender.catalog_version}:{request.full_path}".encode('utf-8'))
+            etag = digest.hexdigest()[:20]
+            last_modified = datetime.fromtimestamp(int(recommender.catalog_built_at), timezone.utc)
+            
+            def with_headers(response):
+                response.set_etag(etag, weak=True)  # Weak: gzip, br and identity bodies share it
+                response.last_modified = last_modified
+                response.headers['Cache-Control'] = HTTP_CACHE_CONTROL[policy]
+                response.vary.add('Accept-Encoding')
+                return response
+            
+            accepted = _response_encoding()
+            cached = response_cache.get((etag, accepted))
+            if cached is None:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                
+                body, encoding = _encode_body(response.get_data(), accepted)
+                cached = (body, encoding, response.mimetype)
+                response_cache.put((etag, accepted), cached)
+            
+            # Only reached with a 200 body for this ETag, so errors are never turned into 304s
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = request.if_modified_since is not None and request.if_modified_since >= last_modified
+            if not_modified:
+                return with_headers(app.response_class(status=304))
+            
+            body, encoding, mimetype = cached
+            response = app.response_class(body, mimetype=mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+            return with_headers(response)
+        return wrapper
+    return decorator
+
+
 @app.route('/')
 def index():
     """Render the main page"""
     return render_template('index.html')
 
+def _encode_cursor(spec, offset):
+    payload = json.dumps({'s': spec, 'o': offset}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor):
+    """Unpack a cursor into the query spec and offset it points at"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        spec, offset = state['s'], state['o']
+    except (ValueError, KeyError, TypeError):
+        raise InvalidParameterError("Invalid cursor")
+    if not isinstance(spec, dict) or type(offset) is not int or offset < 0:
+        raise InvalidParameterError("Invalid cursor")
+    if not ((spec.get('kind') == 'search' and isinstance(spec.get('q'), str)) or
+            (spec.get('kind') == 'similar' and isinstance(spec.get('id'), int))):
+        raise InvalidParameterError("Invalid cursor")
+    
+    # Cursors come from clients, so rebuild (and re-validate) the spec they carry.
+    # A stored blend of None means pure text, not the server's default blend.
+    return _query_spec(spec['kind'], dict(spec, blend=spec.get('blend') or 'text')), offset
+
+
+def _query_spec(kind, params):
+    """Build the canonical ranking spec of a query from request args or a decoded cursor
+    
+    First pages and cursor pages both go through here, so a query always
+    maps to the same spec (and RankingCache key). Each kind only carries the
+    options it uses.
+    """
+    spec = {'kind': kind}
+    if kind == 'search':
+        if not params.get('q'):
+            raise InvalidParameterError("Query parameter required")
+        spec['q'] = params['q']
+        spec['fields'] = _parse_fields(params.get('fields'))
+    else:
+        if params.get('id') in (None, ''):
+            raise InvalidParameterError("Movie ID parameter required")
+        try:
+            spec['id'] = int(params['id'])
+        except (TypeError, ValueError):
+            raise InvalidParameterError("Invalid movie ID format")
+        spec['type'] = _parse_content_type(params.get('type'))
+        spec['mode'] = _parse_mode(params.get('mode'))
+    spec['diversify'] = _parse_diversify(params.get('diversify'))
+    spec['blend'] = _parse_blend(params.get('blend'))
+    return spec
+
+
+def _ranking_depth(spec):
+    """Rows ranked (and so pageable) for a query spec
+    
+    Diversified rankings stop at the MMR pool: each greedy MMR step is a
+    pass over the pool, so ranking deeper would cost the first page far
+    more than the results it returns. People rankings stop at the
+    precomputed neighbour lists they are read from.
+    """
+    depth = PAGINATION_DEPTH
+    if spec.get('diversify') is not None:
+        depth = min(depth, MMR_POOL_SIZE)
+    if spec.get('mode') == 'people':
+        depth = min(depth, PEOPLE_NEIGHBOURS)
+    return depth
+
+
+def _rank(recommender, spec):
+    """Compute the ranking a query spec describes"""
+    depth = _ranking_depth(spec)
+    if spec['kind'] == 'search':
+        return recommender.rank_search(spec['q'], depth, diversify=spec.get('diversify'),
+                                       blend=spec.get('blend'), fields=spec.get('fields'))
+    return recommender.rank_recommendations(spec['id'], depth, diversify=spec.get('diversify'),
+                                            blend=spec.get('blend'), mode=spec.get('mode', 'text'),
+                                            content_type=spec.get('type', 'movie'))
+
+
+def _paged_results(spec, top_n, offset=0):
+    """Return one page of a query's ranking and the cursor for the next page
+    
+    The ranking is computed once (_ranking_depth rows deep) and cached per
+    query and catalog version, so later pages are plain slices. If the entry
+    was evicted or the catalog changed, the ranking is recomputed.
+    """
+    recommender = get_recommender()
+    key = RankingCache.key(spec, recommender.catalog_version)
+    ranking = ranking_cache.get(key)
+    if ranking is None:
+        ranking = run_scoring(_rank, recommender, spec)
+        if ranking is None:
+            return [], None
+        ranking_cache.put(key, ranking)
+    
+    results = recommender.format_ranking(ranking, offset, offset + top_n)
+    next_offset = offset + top_n
+    next_cursor = _encode_cursor(spec, next_offset) if next_offset < len(ranking.indices) else None
+    return results, next_cursor
+
+
 @app.route('/api/search', methods=['GET'])
 def search_movies():
-    """API endpoint for searching movies"""
-    query = request.args.get('q', '')
-    top_n = int(request.args.get('n', 10))
+    """API endpoint for searching movies
     
-    if not query:
-        return jsonify({'error': 'Query parameter required'}), 400
+    Optional `fields` (a FIELD_WEIGHT_PRESETS name such as "actor" or
+    weights like "title:2,people:1") weights matches per record field.
+    Pass the returned next_cursor as `cursor` to fetch the following page.
+    """
+    top_n = _parse_top_n()
+    cursor = request.args.get('cursor')
     
-    recommender = MovieRecommender()
-    results = recommender.search(query, top_n=top_n)
+    if cursor:
+        spec, offset = _decode_cursor(cursor)
+    else:
+        spec, offset = _query_spec('search', request.args), 0
     
-    return jsonify({'results': results})
+    results, next_cursor = _paged_results(spec, top_n, offset)
+    
+    # The ranking was computed for the corrected query; say so
+    did_you_mean = get_recommender().correct_query(spec['q'])
+    return jsonify({'results': results, 'next_cursor': next_cursor, 'did_you_mean': did_you_mean})
 
 @app.route('/api/recommendations', methods=['GET'])
+@http_cached('recommendations')
 def get_recommendations():
-    """API endpoint for getting recommendations for a specific movie"""
-    movie_id = request.args.get('id')
-    top_n = int(request.args.get('n', 10))
+    """API endpoint for getting recommendations for a specific movie
+    
+    `type=tv` looks the ID up among TV shows instead of movies. Optional
+    `mode=people` recommends titles sharing cast and crew, and
+    `mode=mixed` combines that with text similarity.
+    Pass the returned next_cursor as `cursor` to fetch the following page.
+    """
+    top_n = _parse_top_n()
+    cursor = request.args.get('cursor')
     
-    if not movie_id:
-        return jsonify({'error': 'Movie ID parameter required'}), 400
+    if cursor:
+        spec, offset = _decode_cursor(cursor)
+    else:
+        spec, offset = _query_spec('similar', request.args), 0
+    
+    results, next_cursor = _paged_results(spec, top_n, offset)
+    
+    return jsonify({'results': results, 'next_cursor': next_cursor})
+
+@app.route('/api/recommendations/profile', methods=['POST'])
+def get_profile_recommendations():
+    """API endpoint for recommendations based on a watch history
+    
+    Expects a JSON body like {"ids": [550, 680], "weights": [1.0, 0.5], "n": 10};
+    weights are optional and default to 1.0 for every title, and optional
+    "types" (e.g. ["movie", "tv"]) says which namespace each ID is in. Optional
+    "diversify" (0..1) enables MMR re-ranking and "blend" (preset name or
+    {"text": 0.7, "rating": 0.3}) enables hybrid scoring.
+    """
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    movie_ids = payload.get('ids')
+    weights = payload.get('weights')
+    
+    if not movie_ids or not isinstance(movie_ids, list):
+        return jsonify({'error': 'A non-empty list of movie IDs is required'}), 400
+    if len(movie_ids) > MAX_PROFILE_SEEDS:
+        return jsonify({'error': f'At most {MAX_PROFILE_SEEDS} movie IDs are allowed'}), 400
     
     try:
-        movie_id = int(movie_id)
-    except ValueError:
-        return jsonify({'error': 'Invalid movie ID format'}), 400
+        movie_ids = [int(movie_id) for movie_id in movie_ids]
+        if weights is not None:
+            if not isinstance(weights, list) or len(weights) != len(movie_ids):
+                return jsonify({'error': 'weights must be a list matching ids'}), 400
+            weights = [float(weight) for weight in weights]
+            if not all(math.isfinite(weight) and weight > 0 for weight in weights):
+                return jsonify({'error': 'weights must be positive numbers'}), 400
+        content_types = payload.get('types')
+        if content_types is not None:
+            if not isinstance(content_types, list) or len(content_types) != len(movie_ids):
+                return jsonify({'error': 'types must be a list matching ids'}), 400
+            content_types = [_parse_content_type(content_type) for content_type in content_types]
+        top_n = int(payload.get('n', DEFAULT_RESULTS))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid movie ID, weight or n format'}), 400
     
-    recommender = MovieRecommender()
-    results = recommender.get_recommendations(movie_id, top_n=top_n)
+    if top_n < 1:
+        return jsonify({'error': 'n must be a positive integer'}), 400
+    top_n = min(top_n, MAX_RESULTS)
+    diversify = _parse_diversify(payload.get('diversify'))
+    blend = _parse_blend(payload.get('blend'))
+    
+    recommender = get_recommender()
+    results = run_scoring(recommender.get_profile_recommendations, movie_ids, weights=weights,
+                          top_n=top_n, diversify=diversify, blend=blend, content_types=content_types)
     
     return jsonify({'results': results})
 
 @app.route('/api/movie/<int:movie_id>', methods=['GET'])
+@http_cached('movie')
 def get_movie(movie_id):
-    """API endpoint for getting details of a specific movie"""
-    recommender = MovieRecommender()
-    movie = recommender.get_movie_details(movie_id)
+    """API endpoint for getting details of a specific movie (or TV show with `type=tv`)"""
+    content_type = _parse_content_type(request.args.get('type'))
+    recommender = get_recommender()
+    movie = recommender.get_movie_details(movie_id, content_type)
     
     if movie:
         return jsonify({'movie': movie})
@@ -975,37 +2920,56 @@ def get_movie(movie_id):
 @app.route('/api/random', methods=['GET'])
 def get_random():
     """API endpoint for getting random movie recommendations"""
-    top_n = int(request.args.get('n', 10))
+    top_n = _parse_top_n()
     
-    recommender = MovieRecommender()
+    recommender = get_recommender()
     results = recommender.get_random_recommendations(top_n=top_n)
     
     return jsonify({'results': results})
 
 @app.route('/api/popular', methods=['GET'])
+@http_cached('popular')
 def get_popular():
     """API endpoint for getting popular movie recommendations"""
-    top_n = int(request.args.get('n', 10))
+    top_n = _parse_top_n()
     
-    recommender = MovieRecommender()
+    recommender = get_recommender()
     results = recommender.get_popular_recommendations(top_n=top_n)
     
     return jsonify({'results': results})
 
 @app.route('/api/top-rated', methods=['GET'])
+@http_cached('top_rated')
 def get_top_rated():
     """API endpoint for getting top rated movie recommendations"""
-    top_n = int(request.args.get('n', 10))
+    top_n = _parse_top_n()
     
-    recommender = MovieRecommender()
+    recommender = get_recommender()
     results = recommender.get_top_rated_recommendations(top_n=top_n)
     
     return jsonify({'results': results})
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'ingest':
+        # Offline bulk ingestion, e.g.
+        #   python recommendation.py ingest movie_details.jsonl.gz tv_details.jsonl.gz \
+        #       --movie-ids movie_ids_05_15_2024.json.gz --min-popularity 1
+        import argparse
+        parser = argparse.ArgumentParser(prog='recommendation.py ingest',
+                                         description='Build the catalog from TMDB-style export dumps')
+        parser.add_argument('dumps', nargs='+', help='JSON Lines files of movie/TV details (.gz allowed)')
+        parser.add_argument('--movie-ids', nargs='*', default=[], help='TMDB daily movie ID exports used as an allow-list')
+        parser.add_argument('--tv-ids', nargs='*', default=[], help='TMDB daily TV series ID exports used as an allow-list')
+        parser.add_argument('--min-popularity', type=float, default=0.0)
+        parser.add_argument('--no-dedupe', action='store_true', help='Skip near-duplicate detection')
+        args = parser.parse_args(sys.argv[2:])
+        ingest_dumps(args.dumps, movie_id_exports=args.movie_ids, tv_id_exports=args.tv_ids,
+                     min_popularity=args.min_popularity, dedupe=not args.no_dedupe)
+        sys.exit(0)
+    
     # Initialize recommender to ensure data is loaded before serving requests
-    recommender = MovieRecommender()
+    recommender = get_recommender()
     
-    # Run the Flask app
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Run the Flask app (threaded so the scoring pool can apply backpressure)
+    app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
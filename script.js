@@ -166,7 +166,7 @@ function createMovieCard(movie) {
   const detailsBtn = document.createElement('button');
   detailsBtn.className = 'details-btn';
   detailsBtn.textContent = 'View Details';
-  detailsBtn.addEventListener('click', () => showMovieDetails(movie.id));
+  detailsBtn.addEventListener('click', () => showMovieDetails(movie.id, movie.content_type));
   
   // Assemble card
   infoDiv.prepend(year);
@@ -179,7 +179,7 @@ function createMovieCard(movie) {
   card.addEventListener('click', (e) => {
     // Only trigger if the click wasn't on the button (which has its own handler)
     if (!e.target.classList.contains('details-btn')) {
-      showMovieDetails(movie.id);
+      showMovieDetails(movie.id, movie.content_type);
     }
   });
   
@@ -187,12 +187,12 @@ function createMovieCard(movie) {
 }
 
 // Show movie details
-async function showMovieDetails(movieId) {
+async function showMovieDetails(movieId, contentType = 'movie') {
   showLoading(true);
   
   try {
     // Fetch detailed movie information
-    const response = await fetch(`${API_BASE_URL}/movie/${movieId}`);
+    const response = await fetch(`${API_BASE_URL}/movie/${movieId}?type=${contentType}`);
     const data = await response.json();
     
     if (data.error) {
@@ -330,7 +330,7 @@ async function showMovieDetails(movieId) {
     recContainer.innerHTML = '<p>Loading recommendations...</p>';
     
     // Fetch similar recommendations
-    fetchSimilarRecommendations(movie.id, recContainer);
+    fetchSimilarRecommendations(movie.id, movie.content_type, recContainer);
     
     // Assemble info section
     infoSection.appendChild(titleYear);
@@ -371,9 +371,9 @@ async function showMovieDetails(movieId) {
 }
 
 // Fetch similar recommendations
-async function fetchSimilarRecommendations(movieId, container) {
+async function fetchSimilarRecommendations(movieId, contentType, container) {
   try {
-    const response = await fetch(`${API_BASE_URL}/recommendations?id=${movieId}&n=6`);
+    const response = await fetch(`${API_BASE_URL}/recommendations?id=${movieId}&type=${contentType || 'movie'}&n=6`);
     const data = await response.json();
     
     if (data.error || !data.results || data.results.length === 0) {
@@ -414,7 +414,7 @@ async function fetchSimilarRecommendations(movieId, container) {
           document.body.removeChild(currentModal);
         }
         // Show details for the new movie
-        showMovieDetails(movie.id);
+        showMovieDetails(movie.id, movie.content_type);
       });
       
       recGrid.appendChild(recCard);